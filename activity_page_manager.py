@@ -1,11 +1,18 @@
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 
 import folium
+import numpy as np
 from jinja2 import Template
 import plotly.graph_objects as go
 
 
+def _write_graph_html(fig: "go.Figure", out: str) -> None:
+    # plotly.js (~3.5 MB) vient du CDN : l'embarquer dans chaque graphe dominait
+    # le temps d'écriture et la taille de static/graphs.
+    fig.write_html(out, include_plotlyjs="cdn")
+
+
 class ActivityPageManager:
     def __init__(self, output_dir: str = "static/activity_pages"):
         self.output_dir = output_dir
@@ -48,21 +55,28 @@ class ActivityPageManager:
             if lat_idx is None or lon_idx is None:
                 return None
 
-            path: List[Tuple[float, float]] = []
-            for row in metrics:
-                vals = row.get("metrics", [])
-                if max(lat_idx, lon_idx) < len(vals):
-                    lat = vals[lat_idx]
-                    lon = vals[lon_idx]
-                    if lat is not None and lon is not None:
-                        path.append((lat, lon))
-
-            if not path:
+            # (lat, lon) en un seul tableau float (None -> NaN), puis un masque
+            # vectorisé pour écarter les points sans GPS.
+            width = max(lat_idx, lon_idx)
+            coords = np.array(
+                [
+                    (vals[lat_idx], vals[lon_idx])
+                    for vals in (row.get("metrics", []) for row in metrics)
+                    if width < len(vals)
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 2)
+            coords = coords[~np.isnan(coords).any(axis=1)]
+
+            if not len(coords):
                 return None
+            path = coords.tolist()
 
             map_file = os.path.join(self.output_dir, f"activity_{activity_id}_map.html").replace("\\", "/")
             m = folium.Map(location=path[0], zoom_start=14)
             folium.PolyLine(path, color="blue", weight=2.5).add_to(m)
+            # Cadrage sur la trace, zoom plafonné : moins de tuiles OSM à charger.
+            m.fit_bounds([coords.min(axis=0).tolist(), coords.max(axis=0).tolist()], max_zoom=16)
             m.save(map_file)
             return f"/{map_file}"
         except Exception as e:
@@ -92,7 +106,7 @@ class ActivityPageManager:
             height=420
         )
         out = f"static/graphs/{activity_id}_hr_zones.html"
-        fig.write_html(out)
+        _write_graph_html(fig, out)
         return f"/{out}"
 
     def _line_graph(self, activity_id: str, y: List[float], title: str, ytitle: str, suffix: str) -> Optional[str]:
@@ -102,7 +116,7 @@ class ActivityPageManager:
         fig.add_trace(go.Scatter(y=y, mode="lines", name=title))
         fig.update_layout(title=title, xaxis_title="Temps", yaxis_title=ytitle, template="plotly_dark", height=420)
         out = f"static/graphs/{activity_id}_{suffix}.html"
-        fig.write_html(out)
+        _write_graph_html(fig, out)
         return f"/{out}"
 
     def generate_graphs(self, activity: Dict, details: Dict) -> List[str]:
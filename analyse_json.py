@@ -8,7 +8,6 @@ import json
 import math
 import argparse
 import logging
-from datetime import datetime, timezone
 
 import numpy as np
 import pandas as pd
@@ -45,12 +44,6 @@ def save_csv(df: pd.DataFrame, path: str):
     df.to_csv(path, index=False, encoding="utf-8")
     logging.info("CSV écrit : %s", path)
 
-def to_datetime_ms(ms):
-    try:
-        return datetime.fromtimestamp(float(ms)/1000.0, tz=timezone.utc)
-    except Exception:
-        return None
-
 def hms(seconds: float) -> str:
     s = int(round(seconds or 0))
     h, r = divmod(s, 3600)
@@ -206,8 +199,9 @@ def parse_timeseries_from_details(details: dict) -> pd.DataFrame:
     df = df.rename(columns={k: KEY_RENAMES.get(k, k) for k in df.columns})
 
     if "timestamp_gmt_ms" in df.columns:
-        df["timestamp_utc"] = df["timestamp_gmt_ms"].apply(to_datetime_ms)
-        df = df.set_index("timestamp_utc", drop=False)
+        ts = pd.to_datetime(pd.to_numeric(df["timestamp_gmt_ms"], errors="coerce"), unit="ms", utc=True)
+        df["timestamp_utc"] = ts
+        df.index = pd.DatetimeIndex(ts, name="timestamp_utc")
 
     for c in ["hr", "speed_mps", "dist_m", "time_s", "moving_s", "elapsed_s",
               "lat", "lon", "vert_mps", "cadence_spm", "cadence_spm_frac",
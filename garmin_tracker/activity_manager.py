@@ -5,11 +5,20 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import re
+import threading
 import time
+from collections import OrderedDict
 
-from typing import Any, Optional
+from typing import Optional
 
 from .echarts import write_timeseries_chart_html
+from .graph_cache import echarts_code_mtime, read_graph_cache, source_hash, source_mtime, write_graph_cache
+from .numeric import ci95_scale, nan_to_none_list, rolling_mean_std
+from .storage import _json_dump, _json_load
+
+
+# 95% confidence band of the 7-activity rolling mean: 1.96 * std / sqrt(7).
+_CI_SCALE = ci95_scale(7)
 
 
 def _generate_pace_ticks(min_pace: float, max_pace: float, step_seconds: float = 15.0) -> list[float]:
@@ -28,14 +37,9 @@ def _generate_pace_ticks(min_pace: float, max_pace: float, step_seconds: float =
     
     step_minutes = step_seconds / 60.0  # Convert to minutes
     start = int(min_pace * 60 / step_seconds) * step_seconds / 60.0  # Round down to nearest step
-    ticks = []
-    current = start
-    while current <= max_pace + 0.001:  # Small epsilon for float comparison
-        if current >= min_pace - 0.001:
-            ticks.append(round(current, 4))  # 4 decimals to avoid float precision issues
-        current += step_minutes
-    
-    return ticks if ticks else []
+    ticks = np.arange(start, max_pace + 0.001, step_minutes)  # Small epsilon for float comparison
+    ticks = ticks[(ticks >= min_pace - 0.001) & (ticks <= max_pace + 0.001)]
+    return np.round(ticks, 4).tolist()  # 4 decimals to avoid float precision issues
 
 
 def _assign_zone_colors(hr_values: list[Optional[float]], zones: list[dict]) -> list[Optional[str]]:
@@ -51,88 +55,104 @@ def _assign_zone_colors(hr_values: list[Optional[float]], zones: list[dict]) ->
     if not zones or len(zones) < 5:
         return [None] * len(hr_values)
     
-    zone_colors = [
+    zone_colors = np.array([
         "rgba(76, 201, 240, 0.9)",      # Z1 - light blue
         "rgba(72, 219, 251, 0.9)",      # Z2 - lighter blue
         "rgba(255, 223, 0, 0.9)",       # Z3 - yellow
         "rgba(255, 140, 0, 0.9)",       # Z4 - orange
         "rgba(255, 77, 141, 0.9)",      # Z5 - red/pink
-    ]
-    
-    colors = []
-    for hr in hr_values:
-        if hr is None:
-            colors.append(None)
-        else:
-            hr_val = float(hr)
-            # Find which zone this HR belongs to
-            for z_idx, zone in enumerate(zones[:5]):
-                if hr_val <= zone.get("max", float('inf')):
-                    colors.append(zone_colors[z_idx])
-                    break
-            else:
-                # Beyond Z5
-                colors.append(zone_colors[4])
-    
-    return colors
+    ], dtype=object)
 
+    # First zone whose max is >= HR (zones are ordered); beyond Z5 stays Z5.
+    maxes = np.array([z.get("max", np.inf) for z in zones[:5]], dtype=np.float64)
+    hr = np.array([np.nan if v is None else float(v) for v in hr_values], dtype=np.float64)
+    colors = zone_colors[np.clip(np.searchsorted(maxes, hr, side="left"), 0, 4)]
+    colors[np.isnan(hr)] = None
+    return colors.tolist()
 
-def _graph_cache_path(output_dir: str) -> str:
-    return os.path.join(output_dir, ".graph_cache.json")
 
+def _field_array(items: list[dict], key: str) -> np.ndarray:
+    """float64 column of `key` across items, NaN where the field is missing."""
+    return np.array([np.nan if (v := a.get(key)) is None else v for a in items], dtype=np.float64)
 
-def _read_graph_cache(output_dir: str) -> dict[str, Any] | None:
-    path = _graph_cache_path(output_dir)
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else None
-    except Exception:
-        return None
 
+def _pool_lengths_m(items: list[dict]) -> np.ndarray:
+    """Pool length in meters for each activity, NaN when unknown.
 
-def _write_graph_cache(output_dir: str, payload: dict[str, Any]) -> None:
-    path = _graph_cache_path(output_dir)
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
-    except Exception:
-        # Best-effort only.
-        pass
-
-
-def _has_any_html(output_dir: str) -> bool:
-    try:
-        return any(name.endswith(".html") for name in os.listdir(output_dir))
-    except Exception:
-        return False
-
-
-def _clean_html(output_dir: str) -> None:
-    try:
-        for name in os.listdir(output_dir):
-            if name.endswith(".html"):
-                try:
-                    os.remove(os.path.join(output_dir, name))
-                except OSError:
-                    pass
-    except Exception:
-        pass
+    Garmin summary often contains:
+      - poolLength: e.g. 2500.0
+      - unitOfPoolLength: { unitKey: 'meter', factor: 100.0 }
+    In that case poolLength / factor = 25m.
+    """
+    def numeric(values: list) -> np.ndarray:
+        return np.asarray(pd.to_numeric(np.array(values, dtype=object), errors="coerce"), dtype=np.float64)
 
+    raw = numeric([a.get("poolLength") for a in items])
+    factor = numeric([u.get("factor") if isinstance(u := a.get("unitOfPoolLength"), dict) else None for a in items])
+    # Missing or non-positive factor: poolLength is already in meters.
+    pool = raw / np.where(factor > 0, factor, 1.0)
+    # Defensive: ignore absurd values (NaN fails the test too).
+    pool[~((pool > 0) & (pool <= 200))] = np.nan
+    return pool
 
-def _source_mtime(path: str) -> float:
-    try:
-        return float(os.path.getmtime(path))
-    except OSError:
-        return 0.0
 
+def _scan_html(output_dir: str, *, delete: bool = False) -> bool:
+    """Return whether output_dir holds any .html file, removing them if `delete`.
 
-def _echarts_mtime() -> float:
+    One os.scandir pass serves both the cache check and the cleanup.
+    """
+    found = False
     try:
-        path = os.path.join(os.path.dirname(__file__), "echarts.py")
-        return float(os.path.getmtime(path))
+        with os.scandir(output_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".html"):
+                    found = True
+                    if not delete:
+                        break
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
     except OSError:
-        return 0.0
+        pass
+    return found
+
+
+# Garmin typeKey -> sport plotted by plot_interactive_graphs_by_type.
+_CANON: dict[str, str] = {
+    **dict.fromkeys(
+        ("running", "treadmill_running", "trail_running", "track_running", "virtual_running", "indoor_running"),
+        "running",
+    ),
+    **dict.fromkeys(
+        (
+            "cycling",
+            "road_biking",
+            "mountain_biking",
+            "gravel_cycling",
+            "indoor_cycling",
+            "virtual_cycling",
+            "e_bike_fitness",
+            "e_bike_mountain",
+        ),
+        "cycling",
+    ),
+    **dict.fromkeys(("swimming", "lap_swimming", "pool_swimming", "open_water_swimming"), "swimming"),
+    "strength_training": "strength_training",
+}
+
+
+# Shape of Garmin's startTimeLocal ("2024-05-01 07:12:45"), which NumPy casts natively.
+_ISO_LOCAL = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?")
+
+
+# activities_file -> (mtime, activités parsées) : évite de re-parser le JSON
+# tant que le fichier n'a pas changé. Une entrée par fichier (un nouveau mtime
+# remplace l'ancienne) et LRU borné : seuls les derniers utilisateurs restent
+# en mémoire.
+_ACTIVITY_CACHE: "OrderedDict[str, tuple[float, list]]" = OrderedDict()
+_ACTIVITY_CACHE_MAX = 8
+_ACTIVITY_CACHE_LOCK = threading.Lock()
 
 
 class GarminActivityManager:
@@ -142,13 +162,26 @@ class GarminActivityManager:
         os.makedirs("data", exist_ok=True)
         self.activities = activities if isinstance(activities, list) else self._load_data()
         self.hr_zones = hr_zones  # Optional: list of dicts with 'min', 'max'
+        self._start_ts: pd.DatetimeIndex | None = None
+        self._columns: dict[str, np.ndarray] = {}
 
     def _load_data(self):
         """Charge uniquement les activités pour l'utilisateur spécifié."""
         if os.path.exists(self.activities_file):
-            with open(self.activities_file, 'r', encoding='utf-8') as f:
+            mtime = source_mtime(self.activities_file)
+            with _ACTIVITY_CACHE_LOCK:
+                hit = _ACTIVITY_CACHE.get(self.activities_file)
+                if hit and hit[0] == mtime:
+                    _ACTIVITY_CACHE.move_to_end(self.activities_file)
+                    return hit[1]
+            with open(self.activities_file, 'rb') as f:
                 try:
-                    data = json.load(f)
+                    data = _json_load(f)
+                    with _ACTIVITY_CACHE_LOCK:
+                        _ACTIVITY_CACHE[self.activities_file] = (mtime, data)
+                        _ACTIVITY_CACHE.move_to_end(self.activities_file)
+                        while len(_ACTIVITY_CACHE) > _ACTIVITY_CACHE_MAX:
+                            _ACTIVITY_CACHE.popitem(last=False)
                     logging.info(f"Données chargées depuis {self.activities_file}.")
                     return data
                 except json.JSONDecodeError:
@@ -157,70 +190,111 @@ class GarminActivityManager:
             logging.error(f"Fichier non trouvé : {self.activities_file}.")
         return []
 
+    def _start_times(self) -> pd.DatetimeIndex:
+        """startTimeLocal de chaque activité, parsé une seule fois (NaT si absent ou invalide)."""
+        if self._start_ts is None or len(self._start_ts) != len(self.activities):
+            iso = [a.get("startTimeLocal") or None for a in self.activities]
+            self._start_ts = None
+            if all(v is None or (isinstance(v, str) and _ISO_LOCAL.fullmatch(v)) for v in iso):
+                try:
+                    # Cas courant : cast en bloc côté NumPy, None -> NaT.
+                    self._start_ts = pd.DatetimeIndex(np.array(iso, dtype="datetime64[s]"))
+                except ValueError:
+                    pass  # Bonne forme mais date impossible (mois 13...).
+            if self._start_ts is None:
+                self._start_ts = pd.DatetimeIndex(
+                    pd.to_datetime(np.array(iso, dtype=object), format="ISO8601", errors="coerce", cache=True)
+                )
+        return self._start_ts
+
+    def _column(self, key: str) -> np.ndarray:
+        """Champ numérique `key` de chaque activité (NaN si absent), extrait une seule fois.
+
+        Partagé par les deux méthodes de tracé, qui n'en prennent que leurs lignes.
+        """
+        col = self._columns.get(key)
+        if col is None or len(col) != len(self.activities):
+            col = self._columns[key] = _field_array(self.activities, key)
+        return col
+
+    def _graph_cache_fresh(self, output_dir: str, src_mtime: float, echarts_mtime: float) -> bool:
+        """Les graphes de output_dir correspondent-ils au fichier d'activités actuel ?"""
+        cache = read_graph_cache(output_dir)
+        if (
+            not cache
+            or cache.get("source") != self.activities_file
+            or float(cache.get("echarts_mtime") or 0.0) != echarts_mtime
+        ):
+            return False
+        if float(cache.get("source_mtime") or 0.0) == src_mtime:
+            return True
+
+        # Fichier réécrit sans changement (sync sans nouvelle activité, touch) :
+        # même contenu, mêmes graphes. On met juste le mtime à jour.
+        src_hash = source_hash(self.activities_file)
+        if not src_hash or cache.get("source_hash") != src_hash:
+            return False
+        write_graph_cache(output_dir, {**cache, "source_mtime": src_mtime})
+        return True
+
     def plot_interactive_graphs(self, output_dir):
         """Crée des graphiques interactifs (ECharts) pour les activités running."""
         os.makedirs(output_dir, exist_ok=True)
 
-        src_mtime = _source_mtime(self.activities_file)
-        echarts_mtime = _echarts_mtime()
-        cache = _read_graph_cache(output_dir)
-        if (
-            cache
-            and cache.get("source") == self.activities_file
-            and float(cache.get("source_mtime") or 0.0) == src_mtime
-            and float(cache.get("echarts_mtime") or 0.0) == echarts_mtime
-            and _has_any_html(output_dir)
-        ):
+        src_mtime = source_mtime(self.activities_file)
+        echarts_mtime = echarts_code_mtime()
+        fresh = self._graph_cache_fresh(output_dir, src_mtime, echarts_mtime)
+        # Stale cache: the same scan removes the old graphs.
+        if _scan_html(output_dir, delete=not fresh) and fresh:
             return
 
-        _clean_html(output_dir)
+        six_months_ago = pd.Timestamp(datetime.now() - timedelta(days=1460))
 
-        six_months_ago = datetime.now() - timedelta(days=1460)
-
-        filtered_activities = [
-            a for a in self.activities
-            if a.get("activityType", {}).get("typeKey") == "running"
-            and datetime.fromisoformat(a["startTimeLocal"]) >= six_months_ago
-            and a.get("distance", 0) > 0
-            and a.get("duration", 0) > 0
-        ]
+        # Dates parsées en bloc : un seul masque (NaT -> False) puis un tri stable.
+        ts = self._start_times()
+        distance = self._column("distance")
+        duration = self._column("duration")
+        is_run = np.fromiter(
+            (a.get("activityType", {}).get("typeKey") == "running" for a in self.activities),
+            dtype=bool,
+            count=len(self.activities),
+        )
+        idx = np.flatnonzero(is_run & (distance > 0) & (duration > 0) & (ts >= six_months_ago))
 
-        if not filtered_activities:
+        if not len(idx):
             logging.warning("Aucune activité valide pour tracer les graphiques.")
             return
 
-        filtered_activities.sort(key=lambda x: datetime.fromisoformat(x["startTimeLocal"]))
-
-        dates = [datetime.fromisoformat(a["startTimeLocal"]) for a in filtered_activities]
-        distances = [a["distance"] / 1000 for a in filtered_activities]
-        durations = [a["duration"] / 60 for a in filtered_activities]
-        avg_hrs = [a.get("averageHR") for a in filtered_activities]
-        avg_paces = [(d / dist) for d, dist in zip(durations, distances)]
+        idx = idx[np.argsort(ts.asi8[idx], kind="stable")]
+        distances = distance[idx] / 1000
+        durations = duration[idx] / 60
+        avg_hrs = self._column("averageHR")[idx]
 
-        data = pd.DataFrame({
-            "Date": dates,
-            "Distance (km)": distances,
-            "Duration (min)": durations,
-            "Pace (min/km)": avg_paces,
-            "Average HR": avg_hrs,
-        })
-        data.set_index("Date", inplace=True)
+        data = pd.DataFrame(
+            {
+                "Distance (km)": distances,
+                "Duration (min)": durations,
+                "Pace (min/km)": durations / distances,
+                "Average HR": avg_hrs,
+            },
+            index=pd.DatetimeIndex(ts[idx], name="Date"),
+        )
 
         for col in ["Distance (km)", "Duration (min)", "Pace (min/km)", "Average HR"]:
             if col in data:
-                data[f"{col}_MA"] = data[col].rolling(window=7, min_periods=1).mean()
-                data[f"{col}_Std"] = data[col].rolling(window=7, min_periods=1).std()
-                data[f"{col}_CI"] = 1.96 * (data[f"{col}_Std"] / np.sqrt(7))
+                ma, std = rolling_mean_std(data[col].to_numpy(dtype=np.float64), 7)
+                data[f"{col}_MA"] = ma
+                data[f"{col}_CI"] = std * _CI_SCALE
 
         def create_plot(data, column, title, yaxis_title, color, output_file):
             if column not in data or data[column].isnull().all():
                 logging.warning(f"Aucune donnée valide pour {column}.")
                 return
 
-            x = [d.date().isoformat() for d in data.index]
-            y = [None if pd.isna(v) else float(v) for v in data[column].tolist()]
-            y_ma = [None if pd.isna(v) else float(v) for v in data[f"{column}_MA"].tolist()]
-            y_ci = [None if pd.isna(v) else float(v) for v in data[f"{column}_CI"].tolist()]
+            x = data.index.strftime("%Y-%m-%d").tolist()
+            y = nan_to_none_list(data[column])
+            y_ma = nan_to_none_list(data[f"{column}_MA"])
+            y_ci = nan_to_none_list(data[f"{column}_CI"])
 
             # Generate pace ticks and set fixed limits for pace graphs
             y_ticks = None
@@ -263,12 +337,13 @@ class GarminActivityManager:
         create_plot(data, "Pace (min/km)", "Allure", "Allure (min/km)", "#4CC9F0", "pace.html")
         create_plot(data, "Average HR", "Fréquence cardiaque moyenne", "BPM", "#4CC9F0", "average_hr.html")
 
-        _write_graph_cache(
+        write_graph_cache(
             output_dir,
             {
                 "engine": "echarts",
                 "source": self.activities_file,
                 "source_mtime": src_mtime,
+                "source_hash": source_hash(self.activities_file),
                 "echarts_mtime": echarts_mtime,
             },
         )
@@ -282,36 +357,20 @@ class GarminActivityManager:
 
         os.makedirs(output_dir, exist_ok=True)
 
-        src_mtime = _source_mtime(self.activities_file)
-        echarts_mtime = _echarts_mtime()
-        cache = _read_graph_cache(output_dir)
-        if (
-            cache
-            and cache.get("source") == self.activities_file
-            and float(cache.get("source_mtime") or 0.0) == src_mtime
-            and float(cache.get("echarts_mtime") or 0.0) == echarts_mtime
-            and _has_any_html(output_dir)
-        ):
+        src_mtime = source_mtime(self.activities_file)
+        echarts_mtime = echarts_code_mtime()
+        fresh = self._graph_cache_fresh(output_dir, src_mtime, echarts_mtime)
+        # Stale cache: the same scan removes the old graphs.
+        if _scan_html(output_dir, delete=not fresh) and fresh:
             return
 
-        _clean_html(output_dir)
-
-        six_months_ago = datetime.now() - timedelta(days=1460)
+        six_months_ago = pd.Timestamp(datetime.now() - timedelta(days=1460))
+        ts = self._start_times()
+        recent = ts >= six_months_ago  # NaT -> False
 
         def activity_type(a: dict) -> str:
             return (a.get("activityType") or {}).get("typeKey") or "other"
 
-        def parse_date(a: dict):
-            s = a.get("startTimeLocal")
-            if not s:
-                return None
-            try:
-                return datetime.fromisoformat(s)
-            except Exception:
-                return None
-
-        allowed_types = {"swimming", "cycling", "running", "strength_training"}
-
         def metrics_for_type(type_key: str) -> list[tuple[str, str, str]]:
             """Return list of (metric_key, title, y_label)."""
             if type_key == "running":
@@ -343,76 +402,20 @@ class GarminActivityManager:
                 ]
             return []
 
-        def canonical_type(type_key: str) -> str | None:
-            if not type_key:
-                return None
-            k = str(type_key)
-            if k in {"running", "treadmill_running", "trail_running", "track_running", "virtual_running", "indoor_running"}:
-                return "running"
-            if k in {
-                "cycling",
-                "road_biking",
-                "mountain_biking",
-                "gravel_cycling",
-                "indoor_cycling",
-                "virtual_cycling",
-                "e_bike_fitness",
-                "e_bike_mountain",
-            }:
-                return "cycling"
-            if k in {"swimming", "lap_swimming", "pool_swimming", "open_water_swimming"}:
-                return "swimming"
-            if k in {"strength_training"}:
-                return "strength_training"
-            return None
-
-        def pool_length_m(a: dict) -> float | None:
-            """Return pool length in meters if present.
-
-            Garmin summary often contains:
-              - poolLength: e.g. 2500.0
-              - unitOfPoolLength: { unitKey: 'meter', factor: 100.0 }
-            In that case poolLength / factor = 25m.
-            """
-
-            raw = a.get("poolLength")
-            if raw is None:
-                return None
-            try:
-                v = float(raw)
-            except Exception:
-                return None
-            if v <= 0:
-                return None
-
-            unit = a.get("unitOfPoolLength")
-            if isinstance(unit, dict):
-                factor = unit.get("factor")
-                try:
-                    f = float(factor) if factor is not None else None
-                except Exception:
-                    f = None
-                if f and f > 0:
-                    v = v / f
-
-            # Defensive: ignore absurd values
-            if v <= 0 or v > 200:
-                return None
-            return v
-
-        # Group activities by type
-        groups: dict[str, list[dict]] = {}
-        for a in self.activities:
-            dt = parse_date(a)
-            if not dt or dt < six_months_ago:
-                continue
-            canon = canonical_type(activity_type(a))
-            if canon not in allowed_types:
+        # Group activities (by position in self.activities) by type
+        groups: dict[str, list[int]] = {}
+        # Sorted by start time once (stable): every group then inherits that order.
+        recent_idx = np.flatnonzero(recent)
+        recent_idx = recent_idx[np.argsort(ts.asi8[recent_idx], kind="stable")]
+        for i in recent_idx:
+            a = self.activities[i]
+            canon = _CANON.get(activity_type(a))
+            if canon is None:
                 continue
             # Keep only activities with a minimum of structure
             if (a.get("duration") or 0) <= 0 and (a.get("distance") or 0) <= 0:
                 continue
-            groups.setdefault(canon, []).append(a)
+            groups.setdefault(canon, []).append(i)
 
         if not groups:
             return
@@ -429,17 +432,17 @@ class GarminActivityManager:
             if column not in df or df[column].isnull().all():
                 return
 
-            x = [d.date().isoformat() for d in df.index]
-            y = [None if pd.isna(v) else float(v) for v in df[column].tolist()]
+            x = df.index.strftime("%Y-%m-%d").tolist()
+            y = nan_to_none_list(df[column])
 
             y_ma = None
             y_ci = None
             ma_col = f"{column}_MA"
             ci_col = f"{column}_CI"
             if ma_col in df:
-                y_ma = [None if pd.isna(v) else float(v) for v in df[ma_col].tolist()]
+                y_ma = nan_to_none_list(df[ma_col])
             if ci_col in df:
-                y_ci = [None if pd.isna(v) else float(v) for v in df[ci_col].tolist()]
+                y_ci = nan_to_none_list(df[ci_col])
 
             # Prepare Y-axis overrides and colors based on metric type
             y_axis_min_override = None
@@ -486,69 +489,48 @@ class GarminActivityManager:
             )
 
         # Generate graphs for each type
-        for type_key, items in groups.items():
-            items.sort(key=lambda x: parse_date(x) or datetime.min)
-
-            rows = []
-            for a in items:
-                dt = parse_date(a)
-                if not dt:
-                    continue
-
-                swim_pool_m = pool_length_m(a) if type_key == "swimming" else None
-                norm_factor = (50.0 / swim_pool_m) if (swim_pool_m and swim_pool_m > 0) else 1.0
-
-                distance_km = (a.get("distance") or 0) / 1000
-                duration_min = (a.get("duration") or 0) / 60
-
-                pace_min_km = None
-                if distance_km and duration_min and distance_km > 0:
-                    pace_min_km = duration_min / distance_km
-
-                pace_min_100m = None
-                if distance_km and duration_min and distance_km > 0:
-                    pace_min_100m = duration_min / (distance_km * 10.0)
-
-                avg_swolf = a.get("averageSwolf")
-                swim_cadence_spm = a.get("averageSwimCadenceInStrokesPerMinute")
-                strokes_per_length = a.get("avgStrokes")
-
-                rows.append(
-                    {
-                        "Date": dt,
-                        "distance_km": distance_km if distance_km > 0 else None,
-                        "duration_min": duration_min if duration_min > 0 else None,
-                        "pace_min_km": pace_min_km,
-                        "pace_min_100m": pace_min_100m,
-                        "avg_hr": a.get("averageHR"),
-                        # Normalize swim metrics to a 50m pool when pool length is known.
-                        "avg_swolf": (float(avg_swolf) * norm_factor) if avg_swolf is not None else None,
-                        "swim_cadence_spm": swim_cadence_spm,
-                        "strokes_per_length": (float(strokes_per_length) * norm_factor) if strokes_per_length is not None else None,
-                    }
-                )
+        for type_key, order in groups.items():
 
-            if len(rows) < 1:
+            needed = [metric_key for metric_key, _, _ in metrics_for_type(type_key)]
+            if not order or not needed:
                 continue
 
-            df = pd.DataFrame(rows)
-            df.set_index("Date", inplace=True)
+            # Raw fields come from the shared float64 columns (NaN if missing);
+            # every derived metric is a vectorized expression over the group.
+            distance_km = self._column("distance")[order] / 1000
+            duration_min = self._column("duration")[order] / 60
+            has_distance = distance_km > 0  # NaN -> False
+            has_duration = duration_min > 0
+            has_pace = has_distance & has_duration
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                derived = {
+                    "distance_km": np.where(has_distance, distance_km, np.nan),
+                    "duration_min": np.where(has_duration, duration_min, np.nan),
+                    "pace_min_km": np.where(has_pace, duration_min / distance_km, np.nan),
+                    "pace_min_100m": np.where(has_pace, duration_min / (distance_km * 10.0), np.nan),
+                    "avg_hr": self._column("averageHR")[order],
+                }
+
+            if type_key == "swimming":
+                # Normalize swim metrics to a 50m pool when pool length is known.
+                pool_m = _pool_lengths_m([self.activities[i] for i in order])
+                norm_factor = np.where(np.isnan(pool_m), 1.0, 50.0 / pool_m)
+                derived["avg_swolf"] = self._column("averageSwolf")[order] * norm_factor
+                derived["swim_cadence_spm"] = self._column("averageSwimCadenceInStrokesPerMinute")[order]
+                derived["strokes_per_length"] = self._column("avgStrokes")[order] * norm_factor
+
+            # Only the columns this sport actually plots.
+            cols = {key: derived[key] for key in needed}
+
+            df = pd.DataFrame(cols, index=pd.DatetimeIndex(ts[order], name="Date"))
 
             # rolling bands
-            for col in [
-                "distance_km",
-                "duration_min",
-                "pace_min_km",
-                "pace_min_100m",
-                "avg_hr",
-                "avg_swolf",
-                "swim_cadence_spm",
-                "strokes_per_length",
-            ]:
-                if col in df and not df[col].isnull().all():
-                    df[f"{col}_MA"] = df[col].rolling(window=7, min_periods=1).mean()
-                    df[f"{col}_Std"] = df[col].rolling(window=7, min_periods=1).std()
-                    df[f"{col}_CI"] = 1.96 * (df[f"{col}_Std"] / np.sqrt(7))
+            for col in needed:
+                if not df[col].isnull().all():
+                    ma, std = rolling_mean_std(df[col].to_numpy(dtype=np.float64), 7)
+                    df[f"{col}_MA"] = ma
+                    df[f"{col}_CI"] = std * _CI_SCALE
 
             for metric_key, title, y_label in metrics_for_type(type_key):
                 # Skip pace for non-distance sports / missing values
@@ -565,18 +547,21 @@ class GarminActivityManager:
                     color=metric_color,
                 )
 
-        _write_graph_cache(
+        write_graph_cache(
             output_dir,
             {
                 "engine": "echarts",
                 "source": self.activities_file,
                 "source_mtime": src_mtime,
+                "source_hash": source_hash(self.activities_file),
+                "echarts_mtime": echarts_mtime,
             },
         )
 
     def update_data(self):
         logging.info("Récupération des résumés d'activités depuis l'API...")
-        pass
+        self._start_ts = None
+        self._columns.clear()
 
     def update_activity_details(self):
         if not self.activities:
@@ -598,7 +583,7 @@ class GarminActivityManager:
             try:
                 details = self._fetch_activity_details(activity_id)
                 with open(details_file, "w", encoding="utf-8") as f:
-                    json.dump(details, f, indent=4)
+                    _json_dump(details, f, indent=4)
                 logging.info(f"Détails enregistrés pour l'activité ID {activity_id}.")
             except Exception as e:
                 logging.error(f"Erreur lors de la récupération des détails pour l'activité ID {activity_id} : {e}")
@@ -629,5 +614,5 @@ class GarminActivityManager:
     def save_to_trainings_file(self, trainings):
         file_path = os.path.join("data", "trainings.json")
         with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(trainings, f, indent=4)
+            _json_dump(trainings, f, indent=4)
         logging.info(f"Trainings sauvegardés dans {file_path}.")
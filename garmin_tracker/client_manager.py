@@ -1,15 +1,24 @@
 import json
 import logging
 import os
+import re
 import socket
 import ssl
+import threading
+import time
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Tuple
 
 from garminconnect import Garmin
 
 from .garmin_sync import GarminSyncService
 
+try:
+    from requests.adapters import HTTPAdapter
+except ImportError:  # Optional: garth keeps its default pool when requests isn't importable.
+    HTTPAdapter = None
+
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -24,86 +33,123 @@ class GarminLoginError(Exception):
         return self.user_message
 
 
-def _tcp_check(host: str, port: int = 443, timeout: float = 3.0) -> Tuple[bool, Optional[str]]:
+def _tls_check(host: str, port: int = 443, timeout: float = 3.0) -> Tuple[Optional[str], Optional[str]]:
+    """Single TCP+TLS probe. Returns (failure kind, detail), (None, None) if reachable.
+
+    kind is "network" when the TCP connect itself fails, "ssl" for a certificate
+    problem and "tls" for any other handshake failure.
+    """
     try:
-        with socket.create_connection((host, port), timeout=timeout):
-            return True, None
+        sock = socket.create_connection((host, port), timeout=timeout)
     except OSError as e:
-        return False, f"TCP connect to {host}:{port} failed: {type(e).__name__}: {e}"
-
-
-def _tls_check(host: str, port: int = 443, timeout: float = 3.0) -> Tuple[bool, Optional[str]]:
+        return "network", f"TCP connect to {host}:{port} failed: {type(e).__name__}: {e}"
     try:
         ctx = ssl.create_default_context()
-        with socket.create_connection((host, port), timeout=timeout) as sock:
-            with ctx.wrap_socket(sock, server_hostname=host) as ssock:
-                _ = ssock.version()
-        return True, None
+        with sock, ctx.wrap_socket(sock, server_hostname=host) as ssock:
+            _ = ssock.version()
+        return None, None
     except ssl.SSLCertVerificationError as e:
-        return False, f"TLS certificate verification failed: {e}"
+        return "ssl", f"TLS certificate verification failed: {e}"
     except OSError as e:
-        return False, f"TLS handshake failed: {type(e).__name__}: {e}"
+        detail = f"TLS handshake failed: {type(e).__name__}: {e}"
+        return ("ssl" if "certificate" in detail.lower() else "tls"), detail
+
+
+# A successful preflight stays valid this long: a quick retry (wrong password,
+# another account logging in) skips the handshake.
+_PREFLIGHT_TTL_SECONDS = 60.0
+_preflight_lock = threading.Lock()
+_preflight_ok: dict[str, float] = {}
+
+
+def _preflight_check(host: str) -> Tuple[Optional[str], Optional[str]]:
+    """_tls_check, reusing a recent success for the same host."""
+    with _preflight_lock:
+        ok_at = _preflight_ok.get(host)
+    if ok_at is not None and time.monotonic() - ok_at < _PREFLIGHT_TTL_SECONDS:
+        return None, None
+    failure, detail = _tls_check(host)
+    with _preflight_lock:
+        if failure is None:
+            _preflight_ok[host] = time.monotonic()
+        else:
+            _preflight_ok.pop(host, None)
+    return failure, detail
+
+
+# Keyword families, most specific first: when several appear in the same
+# error, the earliest family in this order wins.
+_LOGIN_ERROR_KINDS: dict[str, tuple[str, str]] = {
+    "ssl": (
+        "ssl",
+        "Connexion HTTPS à Garmin impossible (certificat/SSL). "
+        "Vérifie la date/heure de ton PC et tout proxy/antivirus qui inspecte le HTTPS.",
+    ),
+    "mfa": (
+        "mfa",
+        "Connexion Garmin bloquée par la double authentification (2FA/MFA). "
+        "Cette appli ne gère pas encore la saisie du code.",
+    ),
+    "rate": (
+        "rate_limit",
+        "Trop de tentatives côté Garmin (rate limit). Réessaie dans quelques minutes.",
+    ),
+    "auth": (
+        "auth",
+        "Identifiants Garmin refusés. Vérifie l'email/username utilisé sur Garmin Connect "
+        "et si tu as la 2FA activée.",
+    ),
+    "net": (
+        "network",
+        "Impossible de joindre Garmin Connect (réseau/proxy/pare-feu). "
+        "Vérifie ta connexion internet et que connect.garmin.com est accessible.",
+    ),
+}
+
+# Zero-width lookahead: every position is tested, so overlapping keywords
+# ("...certificate timeout...") are all seen in one scan.
+_LOGIN_ERROR_RE = re.compile(
+    r"(?=(?P<ssl>ssl|cert|tls)"
+    r"|(?P<mfa>mfa|two factor|2fa|otp)"
+    r"|(?P<rate>429|too many|rate)"
+    r"|(?P<auth>401|403|unauthorized|authentication)"
+    r"|(?P<net>connection|timeout|name or service|dns))"
+)
+
+
+@lru_cache(maxsize=256)
+def _classify_text(text: str) -> Tuple[str, str]:
+    """(kind, user message) for a lowercased error text.
+
+    Cached: during an outage or a rate limit the same error comes back on
+    every attempt.
+    """
+    found = {m.lastgroup for m in _LOGIN_ERROR_RE.finditer(text)}
+    for family, (kind, user_message) in _LOGIN_ERROR_KINDS.items():
+        if family in found:
+            return kind, user_message
+    return "unknown", "Connexion Garmin impossible. Vérifie réseau/identifiants et réessaie."
 
 
 def _classify_login_exception(exc: Exception) -> GarminLoginError:
-    exc_type = type(exc).__name__
-    exc_mod = type(exc).__module__
-    text = f"{exc_mod}.{exc_type} {exc!r} {str(exc)}".lower()
-
-    if "ssl" in text or "certificate" in text or "cert" in text or "tls" in text:
-        return GarminLoginError(
-            user_message=(
-                "Connexion HTTPS à Garmin impossible (certificat/SSL). "
-                "Vérifie la date/heure de ton PC et tout proxy/antivirus qui inspecte le HTTPS."
-            ),
-            kind="ssl",
-            debug=f"{exc_mod}.{exc_type}: {exc!r}",
-        )
-
-    if "mfa" in text or "two factor" in text or "2fa" in text or "otp" in text:
-        return GarminLoginError(
-            user_message=(
-                "Connexion Garmin bloquée par la double authentification (2FA/MFA). "
-                "Cette appli ne gère pas encore la saisie du code."
-            ),
-            kind="mfa",
-            debug=f"{exc_mod}.{exc_type}: {exc!r}",
-        )
-
-    if "429" in text or "too many" in text or "rate" in text:
-        return GarminLoginError(
-            user_message="Trop de tentatives côté Garmin (rate limit). Réessaie dans quelques minutes.",
-            kind="rate_limit",
-            debug=f"{exc_mod}.{exc_type}: {exc!r}",
-        )
-
-    if "401" in text or "403" in text or "unauthorized" in text or "authentication" in text:
-        return GarminLoginError(
-            user_message=(
-                "Identifiants Garmin refusés. Vérifie l'email/username utilisé sur Garmin Connect "
-                "et si tu as la 2FA activée."
-            ),
-            kind="auth",
-            debug=f"{exc_mod}.{exc_type}: {exc!r}",
-        )
-
-    if "connection" in text or "timeout" in text or "name or service" in text or "dns" in text:
-        return GarminLoginError(
-            user_message=(
-                "Impossible de joindre Garmin Connect (réseau/proxy/pare-feu). "
-                "Vérifie ta connexion internet et que connect.garmin.com est accessible."
-            ),
-            kind="network",
-            debug=f"{exc_mod}.{exc_type}: {exc!r}",
-        )
-
+    qualname = f"{type(exc).__module__}.{type(exc).__name__}"
+    exc_repr = repr(exc)
+    # str(exc) stays in the text: garth/requests errors override __str__ with
+    # details (status, URL) that their repr doesn't always carry.
+    kind, user_message = _classify_text(f"{qualname} {exc_repr} {exc}".lower())
+    # A fresh error each time: it gets raised, and raising sets its traceback/cause.
     return GarminLoginError(
-        user_message="Connexion Garmin impossible. Vérifie réseau/identifiants et réessaie.",
-        kind="unknown",
-        debug=f"{exc_mod}.{exc_type}: {exc!r}",
+        user_message=user_message,
+        kind=kind,
+        debug=f"{qualname}: {exc_repr}",
     )
 
 
+# Output files already prepared by a handler in this process (dir + JSON stub).
+_INITIALIZED: set[str] = set()
+_initialized_lock = threading.Lock()
+
+
 class GarminClientHandler:
     def __init__(self, email, password, user_id, output_dir="data"):
         self.email = email
@@ -112,8 +158,12 @@ class GarminClientHandler:
         self.output_file = os.path.join(output_dir, f"{user_id}_activity_details.json")
         self.activities_file = os.path.join(output_dir, f"{user_id}_activities.json")
         self.client = None
-        os.makedirs(output_dir, exist_ok=True)
-        self._initialize_json()
+        self._service: Optional[GarminSyncService] = None
+        with _initialized_lock:
+            if self.output_file not in _INITIALIZED:
+                os.makedirs(output_dir, exist_ok=True)
+                self._initialize_json()
+                _INITIALIZED.add(self.output_file)
 
     def _initialize_json(self):
         if not os.path.exists(self.output_file):
@@ -124,31 +174,32 @@ class GarminClientHandler:
     def login(self):
         host = "connect.garmin.com"
 
-        tcp_ok, tcp_detail = _tcp_check(host)
-        if not tcp_ok:
+        # One connection answers both questions: TCP reachability and TLS trust.
+        failure, detail = _preflight_check(host)
+        if failure == "network":
             raise GarminLoginError(
                 user_message=(
                     "Impossible de joindre Garmin Connect (réseau/proxy/pare-feu). "
                     "Vérifie ta connexion internet."
                 ),
                 kind="network",
-                debug=tcp_detail,
+                debug=detail,
             )
-
-        tls_ok, tls_detail = _tls_check(host)
-        if not tls_ok and tls_detail and "certificate" in tls_detail.lower():
+        if failure == "ssl":
             raise GarminLoginError(
                 user_message=(
                     "Connexion HTTPS à Garmin impossible (certificat/SSL). "
                     "Vérifie la date/heure de ton PC et tout proxy/antivirus."
                 ),
                 kind="ssl",
-                debug=tls_detail,
+                debug=detail,
             )
 
         try:
             self.client = Garmin(self.email, self.password)
             self.client.login()
+            self._service = None
+            self._widen_connection_pool()
             logging.info("Connexion réussie à Garmin Connect.")
         except Exception as e:
             friendly = _classify_login_exception(e)
@@ -160,9 +211,36 @@ class GarminClientHandler:
             )
             raise friendly from e
 
+    def _widen_connection_pool(self):
+        """Keep-alive pool sized for the parallel detail/health fetches.
+
+        garth already reuses one requests.Session; its default pool keeps only a
+        few connections per host, so concurrent fetches would reconnect (TCP+TLS).
+        """
+        sess = getattr(getattr(self.client, "garth", None), "sess", None)
+        if HTTPAdapter is None or sess is None:
+            return
+        for prefix in ("https://", "http://"):
+            current = sess.get_adapter(prefix)
+            # Keep garth's retry policy, only the pool changes.
+            sess.mount(
+                prefix,
+                HTTPAdapter(
+                    pool_connections=10,
+                    pool_maxsize=20,
+                    max_retries=getattr(current, "max_retries", 0),
+                ),
+            )
+
+    def _sync_service(self) -> GarminSyncService:
+        # Shared by activity and health syncs for as long as this login lasts.
+        if self._service is None:
+            self._service = GarminSyncService(self.client, user_id=self.user_id)
+        return self._service
+
     def update_activity_data(self, progress=None):
         logging.info("Début de la mise à jour des données d'activités (sync layer)...")
-        service = GarminSyncService(self.client, user_id=self.user_id)
+        service = self._sync_service()
         service.dump_available_methods()
         result = service.sync_activities(progress=progress)
         logging.info("Sync activités terminé: %s", result)
@@ -170,7 +248,7 @@ class GarminClientHandler:
 
     def update_health_data(self, progress=None):
         logging.info("Début de la mise à jour des données santé (sync layer)...")
-        service = GarminSyncService(self.client, user_id=self.user_id)
+        service = self._sync_service()
         service.dump_available_methods()
         result = service.sync_health_days(progress=progress)
         logging.info("Sync santé terminé: %s", result)
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import base64
+import heapq
 import secrets
 import threading
+import time
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import timedelta
+
+
+_B64 = base64.urlsafe_b64encode
+
+# Max expired sessions evicted per lock acquisition in cleanup().
+_CLEANUP_BATCH = 256
 
 
 @dataclass(frozen=True)
@@ -20,28 +29,38 @@ class InMemoryCredentialsStore:
     """
 
     def __init__(self, ttl: timedelta = timedelta(hours=8)) -> None:
-        self._ttl = ttl
+        self._ttl_s = ttl.total_seconds()
         self._lock = threading.Lock()
-        self._items: dict[str, tuple[GarminCredentials, datetime]] = {}
+        # token -> (creds, created_at); times are time.monotonic() seconds.
+        self._items: dict[str, tuple[GarminCredentials, float]] = {}
+        # (expires_at, token), oldest first: cleanup only touches expired heads.
+        self._expiry: list[tuple[float, str]] = []
 
     def create_session(self, creds: GarminCredentials) -> str:
-        token = secrets.token_urlsafe(32)
+        # 24 random bytes encode to exactly 32 URL-safe chars, no padding to strip.
+        token = _B64(secrets.token_bytes(24)).decode("ascii")
+        now = time.monotonic()
         with self._lock:
-            self._items[token] = (creds, datetime.utcnow())
+            self._items[token] = (creds, now)
+            heapq.heappush(self._expiry, (now + self._ttl_s, token))
+        # Sessions nobody comes back for are dropped here; cheap with the heap.
+        self.cleanup()
         return token
 
     def get(self, token: str | None) -> GarminCredentials | None:
         if not token:
             return None
-        with self._lock:
-            item = self._items.get(token)
-            if not item:
-                return None
-            creds, created_at = item
-            if datetime.utcnow() - created_at > self._ttl:
+        # Lock-free read: dict.get is atomic under the GIL and entries are
+        # immutable tuples. Only eviction takes the lock.
+        item = self._items.get(token)
+        if not item:
+            return None
+        creds, created_at = item
+        if time.monotonic() - created_at > self._ttl_s:
+            with self._lock:
                 self._items.pop(token, None)
-                return None
-            return creds
+            return None
+        return creds
 
     def delete(self, token: str | None) -> None:
         if not token:
@@ -50,8 +69,14 @@ class InMemoryCredentialsStore:
             self._items.pop(token, None)
 
     def cleanup(self) -> None:
-        now = datetime.utcnow()
-        with self._lock:
-            expired = [k for k, (_, t0) in self._items.items() if now - t0 > self._ttl]
-            for k in expired:
-                self._items.pop(k, None)
+        now = time.monotonic()
+        # Evict in short batches so a large backlog never holds the lock for
+        # long; create_session/delete/evictions interleave between batches.
+        while True:
+            with self._lock:
+                for _ in range(_CLEANUP_BATCH):
+                    if not self._expiry or self._expiry[0][0] >= now:
+                        return
+                    # Deleted tokens may still sit in the heap: pop(..., None) absorbs them.
+                    _, token = heapq.heappop(self._expiry)
+                    self._items.pop(token, None)
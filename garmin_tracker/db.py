@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 
@@ -16,15 +16,45 @@ def get_database_url() -> str:
 _ENGINE = None
 _SessionLocal = None
 
+# Applied to every new SQLite connection: WAL lets readers run alongside the
+# writer, NORMAL sync is safe under WAL and saves an fsync per commit.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
+def _apply_sqlite_pragmas(dbapi_conn, _connection_record) -> None:
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 
 def get_engine():
     global _ENGINE
     if _ENGINE is None:
         url = get_database_url()
+        is_sqlite = url.startswith("sqlite:")
         connect_args = {}
-        if url.startswith("sqlite:"):
+        if is_sqlite:
             connect_args = {"check_same_thread": False}
-        _ENGINE = create_engine(url, future=True, pool_pre_ping=True, connect_args=connect_args)
+        _ENGINE = create_engine(
+            url,
+            future=True,
+            # A local file can't drop the connection: the SELECT 1 on every
+            # checkout only pays off for a networked database.
+            pool_pre_ping=not is_sqlite,
+            pool_recycle=3600,
+            connect_args=connect_args,
+        )
+        if is_sqlite:
+            event.listen(_ENGINE, "connect", _apply_sqlite_pragmas)
     return _ENGINE
 
 
@@ -2,8 +2,20 @@ import json
 import os
 import re
 import datetime as dt
+from functools import lru_cache
+from itertools import compress
 from typing import List, Literal, Optional, TypedDict
 
+try:
+    import numpy as np
+except ImportError:  # Optional: the CI band falls back to pure Python.
+    np = None
+
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json is used when orjson isn't installed.
+    orjson = None
+
 
 def _format_pace_label(pace_minutes: float) -> str:
     """Format pace value (minutes/km) to MM:SS format without decimals."""
@@ -26,6 +38,356 @@ class YBand(TypedDict):
     label: str
 
 
+# YYYY-MM or YYYY-MM-DD (optionally with extra suffix)
+_DATE_LIKE_RE = re.compile(r"^[0-9]{4}-[0-9]{2}(?:-[0-9]{2})?")
+
+
+def _is_date_like(s: object) -> bool:
+    # Cheap shape test first; the regex only confirms strings that pass it.
+    if not isinstance(s, str) or len(s) < 7 or s[4] != "-":
+        return False
+    return bool(_DATE_LIKE_RE.match(s))
+
+
+# YYYY-MM[-DD] prefix with captured parts (time portions are ignored)
+_DATE_PREFIX_RE = re.compile(r"^([0-9]{4})-([0-9]{2})(?:-([0-9]{2}))?")
+
+
+# The same date labels come back for every chart of a render pass (all
+# metrics of a user share one x axis): parse each label once.
+@lru_cache(maxsize=8192)
+def _parse_dt_prefix(s: object) -> Optional[dt.date]:
+    # Accept YYYY-MM[-DD][...] and ignore time portions
+    if not s:
+        return None
+    m = _DATE_PREFIX_RE.match(s if isinstance(s, str) else str(s))
+    if not m:
+        return None
+    try:
+        year, month, day = m.groups()
+        return dt.date(int(year), int(month), int(day) if day else 1)
+    except Exception:
+        return None
+
+
+def _ci_band(y_ma: List[Optional[float]], y_ci: List[Optional[float]]) -> tuple:
+    """Stacked-area CI band: (lower = ma - ci, band = upper - lower), None where unknown.
+
+    With NumPy and orjson both available the two columns stay float64 arrays
+    (NaN where unknown): orjson writes them out directly, NaN as null, without
+    a Python object per point.
+    """
+    if np is not None:
+        n = min(len(y_ma), len(y_ci))
+        ma = np.array(y_ma[:n], dtype=np.float64)  # None -> NaN
+        ci = np.array(y_ci[:n], dtype=np.float64)
+        lo = ma - ci
+        width = np.maximum(0.0, (ma + ci) - lo)
+        missing = np.isnan(lo)
+        if orjson is not None:
+            width[missing] = np.nan
+            return lo, width
+        lower = lo.astype(object)
+        band = width.astype(object)
+        lower[missing] = None
+        band[missing] = None
+        return lower.tolist(), band.tolist()
+
+    lower: list[Optional[float]] = []
+    band: list[Optional[float]] = []
+    for ma, ci in zip(y_ma, y_ci):
+        if ma is None or ci is None:
+            lower.append(None)
+            band.append(None)
+        else:
+            lo = float(ma) - float(ci)
+            lower.append(lo)
+            band.append(max(0.0, float(ma) + float(ci) - lo))
+    return lower, band
+
+
+def _np_value_range(
+    x: List[str],
+    series: list[Optional[list]],
+    *,
+    use_time_axis: bool,
+    window_days: int,
+) -> Optional[tuple[float, float]]:
+    """(min, max) of the series over the initial visible window, else over all points.
+
+    NumPy version of the per-point window/mask loops. Raises TypeError/ValueError
+    on input it can't convert (non-date labels, non-numeric values) so the caller
+    can fall back to the pure-Python path.
+    """
+    n = len(x)
+    keep = min(n, int(window_days) if window_days else n)
+    mask = np.zeros(n, dtype=bool)
+    mask[n - keep:] = True
+    if use_time_axis and n:
+        # YYYY-MM[-DD][...] -> day precision; a bare month is its first day.
+        dates = np.array([v[:10] for v in x], dtype="datetime64[D]")
+        valid = ~np.isnat(dates)
+        if not valid.any():
+            mask[:] = True
+        else:
+            start = dates[valid].max() - np.timedelta64(max(0, int(window_days) - 1), "D")
+            in_window = dates >= start  # NaT compares False
+            if in_window.any():
+                mask = in_window
+
+    windowed: list = []
+    every: list = []
+    for serie in series:
+        if serie is None or len(serie) == 0:
+            continue
+        arr = np.array(serie, dtype=np.float64)  # None -> NaN
+        finite = np.isfinite(arr)
+        every.append(arr[finite])
+        m = mask[: len(arr)]
+        windowed.append(arr[: len(m)][m & finite[: len(m)]])
+
+    for chunks in (windowed, every):
+        vals = np.concatenate(chunks) if chunks else np.empty(0)
+        if vals.size:
+            return float(vals.min()), float(vals.max())
+    return None
+
+
+# Page around the option JSON, never formatted with the (possibly large)
+# option inside: the pieces are only concatenated as bytes.
+# Kept as UTF-8 bytes: encoded once at import, written as is for every chart.
+_HTML_HEAD = f"""<!doctype html>
+<html lang=\"fr\">
+<head>
+    <meta charset=\"utf-8\" />
+    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
+    <script src=\"{ECHARTS_CDN}\"></script>
+    <style>
+        html, body {{ height: 100%; margin: 0; background: transparent; overflow: hidden; }}
+        #chart {{ width: 100%; height: 100%; }}
+    </style>
+</head>
+<body>
+    <div id=\"chart\"></div>
+    <script>
+        const el = document.getElementById('chart');
+        const option = """.encode("utf-8")
+
+# Zoom mode only: size the initial dataZoom window from the x labels.
+_HTML_TAIL_ZOOM = """;
+
+        function parseISODatePrefix(s) {
+            // Accept YYYY-MM-DD[...] or YYYY-MM
+            if (!s || typeof s !== 'string') return null;
+            const m = s.match(/^([0-9]{4})-([0-9]{2})(?:-([0-9]{2}))?/);
+            if (!m) return null;
+            const y = Number(m[1]);
+            const mo = Number(m[2]);
+            const d = m[3] ? Number(m[3]) : 1;
+            if (!y || !mo || !d) return null;
+            const dt = new Date(Date.UTC(y, mo - 1, d));
+            return isNaN(dt.getTime()) ? null : dt;
+        }
+
+        function extractXLabels(opt) {
+            // Category axis: xAxis.data
+            if (opt && opt.xAxis && opt.xAxis.type === 'category' && Array.isArray(opt.xAxis.data)) {
+                return opt.xAxis.data;
+            }
+            // Time axis: shared dataset columns { x: [...], ... }
+            if (opt && opt.dataset && opt.dataset.source && Array.isArray(opt.dataset.source.x)) {
+                return opt.dataset.source.x;
+            }
+            // Otherwise derive from first series data: [x, y]
+            const s0 = (opt && Array.isArray(opt.series) && opt.series.length) ? opt.series[0] : null;
+            const data = (s0 && Array.isArray(s0.data)) ? s0.data : [];
+            const out = [];
+            for (const pt of data) {
+                if (Array.isArray(pt) && pt.length >= 2) out.push(pt[0]);
+            }
+            return out;
+        }
+
+        function computeSpanDays(labels) {
+            let minT = null;
+            let maxT = null;
+            for (const v of (labels || [])) {
+                const d = parseISODatePrefix(v);
+                if (!d) continue;
+                const t = d.getTime();
+                if (minT === null || t < minT) minT = t;
+                if (maxT === null || t > maxT) maxT = t;
+            }
+            if (minT === null || maxT === null) return null;
+            const days = Math.round((maxT - minT) / (24 * 3600 * 1000)) + 1;
+            return Math.max(1, days);
+        }
+
+        const chart = echarts.init(el, null, { renderer: 'canvas' });
+
+        function setInitialWindow() {
+            const labels = extractXLabels(option);
+            const n = labels && labels.length ? labels.length : 0;
+            if (n <= 1) return;
+
+            const spanDays = computeSpanDays(labels);
+            let startPct = 0;
+            let endPct = 100;
+
+            if (spanDays !== null) {
+                const windowDays = Math.min(spanDays, VISIBLE_DAYS);
+                startPct = ((spanDays - windowDays) / spanDays) * 100;
+                endPct = 100;
+            } else {
+                const windowPoints = Math.min(n, VISIBLE_DAYS);
+                startPct = ((n - windowPoints) / n) * 100;
+                endPct = 100;
+            }
+
+            if (Array.isArray(option.dataZoom)) {
+                for (const dz of option.dataZoom) {
+                    dz.start = startPct;
+                    dz.end = endPct;
+                }
+            }
+        }
+
+        setInitialWindow();
+        chart.setOption(option);
+        window.addEventListener('resize', () => {
+            chart.resize();
+        });
+    </script>
+</body>
+</html>
+""".encode("utf-8")
+
+# Fit mode: no dataZoom, so none of the window-sizing code is emitted.
+_HTML_TAIL_FIT = """;
+
+        const chart = echarts.init(el, null, { renderer: 'canvas' });
+        chart.setOption(option);
+        window.addEventListener('resize', () => {
+            chart.resize();
+        });
+    </script>
+</body>
+</html>
+""".encode("utf-8")
+
+
+@lru_cache(maxsize=16)
+def _zoom_tail(initial_window_days: int) -> bytes:
+    # Only the window size varies: each distinct tail is built once.
+    return (
+        b";\n\n        // The visible window is ~6 months by default.\n"
+        b"        const VISIBLE_DAYS = Math.max(30, Number(%d) || 180)" % initial_window_days
+    ) + _HTML_TAIL_ZOOM
+
+
+# Scatter/line charts longer than twice this are downsampled before serialization.
+_MAX_POINTS = 2000
+
+
+def _lttb_indices(y: List[Optional[float]], target: int) -> list[int]:
+    """Largest-Triangle-Three-Buckets over (position, y): sorted indices to keep.
+
+    First and last points are always kept; a None value is only picked when its
+    bucket holds nothing else.
+    """
+    n = len(y)
+    if target < 3 or n <= target:
+        return list(range(n))
+
+    every = (n - 2) / (target - 2)
+    keep = [0]
+    a = 0
+    ay = y[0] if y[0] is not None else 0.0
+    for i in range(target - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        # Centroid of the next bucket (the last point closes the series).
+        nxt = [j for j in range(hi, min(int((i + 2) * every) + 1, n)) if y[j] is not None]
+        avg_x = sum(nxt) / len(nxt) if nxt else float(n - 1)
+        avg_y = sum(float(y[j]) for j in nxt) / len(nxt) if nxt else ay
+
+        best = lo
+        best_area = -1.0
+        for j in range(lo, hi):
+            v = y[j]
+            if v is None:
+                continue
+            area = abs((a - avg_x) * (float(v) - ay) - (a - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+        a = best
+        if y[best] is not None:
+            ay = float(y[best])
+    keep.append(n - 1)
+    return keep
+
+
+# Static parts of the chart option, built once and shared by every chart.
+# They are only read (serialized), never mutated per call.
+_BASE_OPTION = {
+    "backgroundColor": "transparent",
+    "textStyle": {"color": "#EAF1FF"},
+    "tooltip": {"trigger": "axis"},
+    # Hide legend (keeps it clean in small iframes)
+    "legend": {"show": False},
+}
+_TITLE_STYLE = {
+    "left": "center",
+    "textStyle": {"color": "#EAF1FF", "fontWeight": "bold", "fontSize": 14},
+}
+_GRID = {"left": 48, "right": 16, "top": 46, "bottom": 36}
+_GRID_ZOOM = {**_GRID, "bottom": 58}  # room for the dataZoom slider
+_X_AXIS_STYLE = {
+    "axisLabel": {"color": "rgba(234, 241, 255, 0.72)", "hideOverlap": True},
+    "axisLine": {"lineStyle": {"color": "rgba(234, 241, 255, 0.15)"}},
+    "axisTick": {"show": False},
+}
+_Y_AXIS_STYLE = {
+    "nameTextStyle": {"color": "rgba(234, 241, 255, 0.72)"},
+    "axisLabel": {"color": "rgba(234, 241, 255, 0.72)"},
+    "splitLine": {"lineStyle": {"color": "rgba(234, 241, 255, 0.08)"}},
+}
+_DATA_ZOOM = [
+    {
+        "type": "inside",
+        "xAxisIndex": 0,
+        "filterMode": "none",
+        "zoomOnMouseWheel": True,
+        "moveOnMouseMove": True,
+        "moveOnMouseWheel": True,
+    },
+    {
+        "type": "slider",
+        "xAxisIndex": 0,
+        "height": 18,
+        "bottom": 10,
+        "borderColor": "rgba(234, 241, 255, 0.10)",
+        "backgroundColor": "rgba(255, 255, 255, 0.02)",
+        "fillerColor": "rgba(76, 201, 240, 0.18)",
+        "handleStyle": {
+            "color": "rgba(255, 77, 141, 0.85)",
+            "borderColor": "rgba(255, 77, 141, 0.25)",
+        },
+        "textStyle": {"color": "rgba(234, 241, 255, 0.65)"},
+        "showDetail": False,
+    },
+]
+
+
+def _encode_option(option: dict) -> bytes:
+    # orjson encodes the point lists several times faster than the stdlib
+    # encoder and already yields UTF-8 bytes: no decode/re-encode round trip.
+    if orjson is not None:
+        return orjson.dumps(option, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(option, ensure_ascii=False).encode("utf-8")
+
+
 def _safe_makedirs(path: str) -> None:
     folder = os.path.dirname(path)
     if folder:
@@ -56,7 +418,9 @@ def write_timeseries_chart_html(
 
     Designed to be embedded in an iframe with a fixed height.
 
-    - x: list of date strings (ISO or display-friendly)
+    - x: list of date strings (ISO or display-friendly), all of the same kind;
+         the axis type is picked from the first, middle and last values only,
+         so callers must not mix ISO dates with other labels
     - y: raw series (nullable)
     - y_ma: moving average series (nullable)
     - y_ci: confidence interval half-width (nullable). If provided with y_ma,
@@ -65,33 +429,33 @@ def write_timeseries_chart_html(
 
     _safe_makedirs(output_path)
 
-    def _is_date_like(s: str) -> bool:
-        # YYYY-MM or YYYY-MM-DD (optionally with extra suffix)
-        return bool(re.match(r"^[0-9]{4}-[0-9]{2}(?:-[0-9]{2})?", str(s or "")))
+    # x is homogeneous in practice: three samples decide the axis type.
+    use_time_axis = (
+        bool(x)
+        and _is_date_like(x[0])
+        and _is_date_like(x[len(x) // 2])
+        and _is_date_like(x[-1])
+    )
+
+    # Very long series: keep the points that shape the curve (LTTB on the raw
+    # series) and take the same indices everywhere so the series stay aligned.
+    if primary_series in ("scatter", "line") and len(x) > 2 * _MAX_POINTS:
+        idx = _lttb_indices(y, _MAX_POINTS)
 
-    use_time_axis = bool(x) and all(_is_date_like(v) for v in x)
+        def _take(vals):
+            return [vals[i] for i in idx] if vals is not None and len(vals) == len(x) else vals
+
+        y, y_ma, y_ci, y_series_colors = _take(y), _take(y_ma), _take(y_ci), _take(y_series_colors)
+        x = [x[i] for i in idx]
 
     def _pair_series(x_vals: List[str], y_vals: List[Optional[float]]) -> list[list[object]]:
-        out: list[list[object]] = []
-        for xv, yv in zip(x_vals, y_vals):
-            out.append([xv, yv])
-        return out
+        return [[xv, yv] for xv, yv in zip(x_vals, y_vals)]
 
     # CI band via stacked area: base = lower, band = (upper - lower)
     lower = None
     band = None
     if y_ma is not None and y_ci is not None:
-        lower = []
-        band = []
-        for ma, ci in zip(y_ma, y_ci):
-            if ma is None or ci is None:
-                lower.append(None)
-                band.append(None)
-            else:
-                lo = float(ma) - float(ci)
-                hi = float(ma) + float(ci)
-                lower.append(lo)
-                band.append(max(0.0, hi - lo))
+        lower, band = _ci_band(y_ma, y_ci)
 
     # Compute a sensible Y range around observed values in the initial visible window.
     def _numeric_values(series_list: list[list[Optional[float]]]) -> list[float]:
@@ -100,7 +464,7 @@ def write_timeseries_chart_html(
             if not serie:
                 continue
             for v in serie:
-                if v is None:
+                if v is None or v != v:  # None / NaN (array CI columns)
                     continue
                 try:
                     vals.append(float(v))
@@ -108,20 +472,6 @@ def write_timeseries_chart_html(
                     continue
         return vals
 
-    def _parse_dt_prefix(s: str) -> Optional[dt.date]:
-        # Accept YYYY-MM[-DD][...] and ignore time portions
-        if not s:
-            return None
-        m = re.match(r"^([0-9]{4})-([0-9]{2})(?:-([0-9]{2}))?", str(s))
-        if not m:
-            return None
-        try:
-            year, month = int(m.group(1)), int(m.group(2))
-            day = int(m.group(3)) if m.group(3) else 1
-            return dt.date(year, month, day)
-        except Exception:
-            return None
-
     def _window_mask() -> list[bool]:
         n = len(x)
         if n == 0:
@@ -146,36 +496,56 @@ def write_timeseries_chart_html(
         keep = min(n, int(initial_window_days) if initial_window_days else n)
         return [False] * (n - keep) + [True] * keep
 
-    mask = _window_mask()
+    def _py_value_range() -> Optional[tuple[float, float]]:
+        mask = _window_mask()
 
-    def _apply_mask(vals: Optional[list[Optional[float]]]) -> list[Optional[float]]:
-        if vals is None:
-            return []
-        return [v for v, keep in zip(vals, mask) if keep]
+        def _apply_mask(vals: Optional[list[Optional[float]]]) -> list[Optional[float]]:
+            return [] if vals is None else list(compress(vals, mask))
 
-    # Build an upper series if CI band was computed.
-    upper = None
-    if lower is not None and band is not None:
-        upper = []
-        for lo, width in zip(lower, band):
-            if lo is None or width is None:
-                upper.append(None)
-            else:
-                upper.append(lo + width)
-
-    window_vals = _numeric_values([
-        _apply_mask(y),
-        _apply_mask(y_ma) if y_ma is not None else [],
-        _apply_mask(lower) if lower is not None else [],
-        _apply_mask(upper) if upper is not None else [],
-    ])
-
-    all_vals = window_vals or _numeric_values([
-        y or [],
-        y_ma or [],
-        lower or [],
-        upper or [],
-    ])
+        # Build an upper series if CI band was computed.
+        upper = None
+        if lower is not None and band is not None:
+            upper = []
+            for lo, width in zip(lower, band):
+                if lo is None or width is None:
+                    upper.append(None)
+                else:
+                    upper.append(lo + width)
+
+        window_vals = _numeric_values([
+            _apply_mask(y),
+            _apply_mask(y_ma) if y_ma is not None else [],
+            _apply_mask(lower) if lower is not None else [],
+            _apply_mask(upper) if upper is not None else [],
+        ])
+
+        all_vals = window_vals or _numeric_values([
+            y or [],
+            y_ma or [],
+            lower if lower is not None else [],
+            upper or [],
+        ])
+        return (min(all_vals), max(all_vals)) if all_vals else None
+
+    # Fixed bounds from the caller (pace/HR charts): no need to scan the values.
+    value_range = None
+    if y_axis_min_override is None or y_axis_max_override is None:
+        if np is not None:
+            upper_arr = None
+            if lower is not None and band is not None:
+                n_ci = min(len(lower), len(band))
+                upper_arr = np.array(lower[:n_ci], dtype=np.float64) + np.array(band[:n_ci], dtype=np.float64)
+            try:
+                value_range = _np_value_range(
+                    x,
+                    [y, y_ma, lower, upper_arr],
+                    use_time_axis=use_time_axis,
+                    window_days=initial_window_days,
+                )
+            except (TypeError, ValueError):
+                value_range = _py_value_range()
+        else:
+            value_range = _py_value_range()
 
     y_axis_min = None
     y_axis_max = None
@@ -188,9 +558,8 @@ def write_timeseries_chart_html(
     
     # Otherwise compute automatically
     if y_axis_min is None or y_axis_max is None:
-        if all_vals:
-            v_min = min(all_vals)
-            v_max = max(all_vals)
+        if value_range is not None:
+            v_min, v_max = value_range
             if y_axis_min is None:
                 y_axis_min = 0.0
             if y_axis_max is None:
@@ -203,91 +572,70 @@ def write_timeseries_chart_html(
                     y_axis_max = v_max + pad
 
     option = {
-        "backgroundColor": "transparent",
-        "textStyle": {"color": "#EAF1FF"},
-        "title": {
-            "text": title,
-            "left": "center",
-            "textStyle": {"color": "#EAF1FF", "fontWeight": "bold", "fontSize": 14},
-        },
-        "grid": {"left": 48, "right": 16, "top": 46, "bottom": 36},
-        "tooltip": {"trigger": "axis"},
+        **_BASE_OPTION,
+        "title": {"text": title, **_TITLE_STYLE},
+        # Interaction mode:
+        # - zoom: show a sliding window and pan/zoom via ECharts dataZoom (keeps Y axis visible)
+        # - fit: no zoom controls, render full interval to the iframe width
+        "grid": _GRID_ZOOM if interaction == "zoom" else _GRID,
         "xAxis": {
             "type": "time" if use_time_axis else "category",
             **({} if use_time_axis else {"data": x}),
-            "axisLabel": {"color": "rgba(234, 241, 255, 0.72)", "hideOverlap": True},
-            "axisLine": {"lineStyle": {"color": "rgba(234, 241, 255, 0.15)"}},
-            "axisTick": {"show": False},
+            **_X_AXIS_STYLE,
         },
         "yAxis": {
             "type": "value",
             "name": y_label,
-            "nameTextStyle": {"color": "rgba(234, 241, 255, 0.72)"},
-            "axisLabel": {"color": "rgba(234, 241, 255, 0.72)"},
-            "splitLine": {"lineStyle": {"color": "rgba(234, 241, 255, 0.08)"}},
+            **_Y_AXIS_STYLE,
             **({"min": y_axis_min, "max": y_axis_max} if y_axis_min is not None and y_axis_max is not None else {}),
             **({"interval": y_ticks[1] - y_ticks[0] if len(y_ticks) > 1 else 0.5} if y_ticks else {}),
         },
         "series": [],
     }
-
-    # Interaction mode:
-    # - zoom: show a sliding window and pan/zoom via ECharts dataZoom (keeps Y axis visible)
-    # - fit: no zoom controls, render full interval to the iframe width
     if interaction == "zoom":
-        option["grid"]["bottom"] = 58
-        option["dataZoom"] = [
-            {
-                "type": "inside",
-                "xAxisIndex": 0,
-                "filterMode": "none",
-                "zoomOnMouseWheel": True,
-                "moveOnMouseMove": True,
-                "moveOnMouseWheel": True,
-            },
-            {
-                "type": "slider",
-                "xAxisIndex": 0,
-                "height": 18,
-                "bottom": 10,
-                "borderColor": "rgba(234, 241, 255, 0.10)",
-                "backgroundColor": "rgba(255, 255, 255, 0.02)",
-                "fillerColor": "rgba(76, 201, 240, 0.18)",
-                "handleStyle": {
-                    "color": "rgba(255, 77, 141, 0.85)",
-                    "borderColor": "rgba(255, 77, 141, 0.25)",
-                },
-                "textStyle": {"color": "rgba(234, 241, 255, 0.65)"},
-                "showDetail": False,
-            },
-        ]
+        option["dataZoom"] = _DATA_ZOOM
+
+    # Time axis: the series share one column-oriented dataset (one flat array
+    # per dimension) and pick their column by name, so each date string is
+    # serialized once and no per-point [x, y] arrays are emitted.
+    if use_time_axis:
+        columns: dict[str, list] = {"x": x}
+        if not y_series_colors:  # colored points stay inline (per-item style)
+            columns["raw"] = y
+        if y_ma is not None:
+            columns["ma"] = y_ma
+        if lower is not None and band is not None:
+            columns["ci_lo"] = lower
+            columns["ci_band"] = band
+        if len(columns) > 1:
+            option["dataset"] = {"dimensions": list(columns), "source": columns}
+
+    def _series_data(dim: str, vals: Optional[list]) -> dict:
+        if use_time_axis:
+            return {"encode": {"x": "x", "y": dim}}
+        return {"data": vals}
 
     def _primary_series_obj() -> dict:
-        # Build data with optional per-point colors
-        if use_time_axis:
-            data_pairs = _pair_series(x, y)
-            if y_series_colors:
-                # Add color to each point if colors provided
-                data_with_colors = []
-                for i, pair in enumerate(data_pairs):
-                    item_color = y_series_colors[i] if i < len(y_series_colors) else None
-                    if item_color and pair[1] is not None:  # Only color if value exists
-                        data_with_colors.append({
-                            "value": pair,
-                            "itemStyle": {"color": item_color, "opacity": 0.9}
-                        })
-                    else:
-                        data_with_colors.append(pair)
-                data = data_with_colors
-            else:
-                data = data_pairs
+        # Per-point colors need inline data items; otherwise read the shared columns.
+        if use_time_axis and y_series_colors:
+            data_with_colors = []
+            for i, pair in enumerate(_pair_series(x, y)):
+                item_color = y_series_colors[i] if i < len(y_series_colors) else None
+                if item_color and pair[1] is not None:  # Only color if value exists
+                    data_with_colors.append({
+                        "value": pair,
+                        "itemStyle": {"color": item_color, "opacity": 0.9}
+                    })
+                else:
+                    data_with_colors.append(pair)
+            series_data = {"data": data_with_colors}
         else:
-            data = y
+            series_data = _series_data("raw", y)
         
         base = {
             "name": "Raw",
             "type": primary_series,
-            "data": data,
+            **series_data,
         }
         if primary_series == "scatter":
             base.update(
@@ -346,7 +694,7 @@ def write_timeseries_chart_html(
             {
                 "name": "MA",
                 "type": "line",
-                "data": _pair_series(x, y_ma) if (use_time_axis and y_ma is not None) else y_ma,
+                **_series_data("ma", y_ma),
                 "showSymbol": False,
                 "smooth": True,
                 "lineStyle": {"width": 2, "color": color},
@@ -358,7 +706,7 @@ def write_timeseries_chart_html(
             {
                 "name": "CI base",
                 "type": "line",
-                "data": _pair_series(x, lower) if use_time_axis else lower,
+                **_series_data("ci_lo", lower),
                 "showSymbol": False,
                 "lineStyle": {"opacity": 0},
                 "stack": "ci",
@@ -368,7 +716,7 @@ def write_timeseries_chart_html(
             {
                 "name": "CI",
                 "type": "line",
-                "data": _pair_series(x, band) if use_time_axis else band,
+                **_series_data("ci_band", band),
                 "showSymbol": False,
                 "lineStyle": {"opacity": 0},
                 "stack": "ci",
@@ -376,112 +724,12 @@ def write_timeseries_chart_html(
             }
         )
 
-    # Hide legend (keeps it clean in small iframes)
-    option["legend"] = {"show": False}
-
-    html = f"""<!doctype html>
-<html lang=\"fr\">
-<head>
-    <meta charset=\"utf-8\" />
-    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
-    <script src=\"{ECHARTS_CDN}\"></script>
-    <style>
-        html, body {{ height: 100%; margin: 0; background: transparent; overflow: hidden; }}
-        #chart {{ width: 100%; height: 100%; }}
-    </style>
-</head>
-<body>
-    <div id=\"chart\"></div>
-    <script>
-        const el = document.getElementById('chart');
-        const option = {json.dumps(option, ensure_ascii=False)};
-
-        // The visible window is ~6 months by default.
-        const VISIBLE_DAYS = Math.max(30, Number({int(initial_window_days)}) || 180);
-        const MODE = {json.dumps(interaction)};
-
-        function parseISODatePrefix(s) {{
-            // Accept YYYY-MM-DD[...] or YYYY-MM
-            if (!s || typeof s !== 'string') return null;
-            const m = s.match(/^([0-9]{{4}})-([0-9]{{2}})(?:-([0-9]{{2}}))?/);
-            if (!m) return null;
-            const y = Number(m[1]);
-            const mo = Number(m[2]);
-            const d = m[3] ? Number(m[3]) : 1;
-            if (!y || !mo || !d) return null;
-            const dt = new Date(Date.UTC(y, mo - 1, d));
-            return isNaN(dt.getTime()) ? null : dt;
-        }}
-
-        function extractXLabels(opt) {{
-            // Category axis: xAxis.data
-            if (opt && opt.xAxis && opt.xAxis.type === 'category' && Array.isArray(opt.xAxis.data)) {{
-                return opt.xAxis.data;
-            }}
-            // Time axis: derive from first series data: [x, y]
-            const s0 = (opt && Array.isArray(opt.series) && opt.series.length) ? opt.series[0] : null;
-            const data = (s0 && Array.isArray(s0.data)) ? s0.data : [];
-            const out = [];
-            for (const pt of data) {{
-                if (Array.isArray(pt) && pt.length >= 2) out.push(pt[0]);
-            }}
-            return out;
-        }}
-
-        function computeSpanDays(labels) {{
-            let minT = null;
-            let maxT = null;
-            for (const v of (labels || [])) {{
-                const d = parseISODatePrefix(v);
-                if (!d) continue;
-                const t = d.getTime();
-                if (minT === null || t < minT) minT = t;
-                if (maxT === null || t > maxT) maxT = t;
-            }}
-            if (minT === null || maxT === null) return null;
-            const days = Math.round((maxT - minT) / (24 * 3600 * 1000)) + 1;
-            return Math.max(1, days);
-        }}
-
-        const chart = echarts.init(el, null, {{ renderer: 'canvas' }});
-
-        function setInitialWindow() {{
-            if (MODE !== 'zoom') return;
-            const labels = extractXLabels(option);
-            const n = labels && labels.length ? labels.length : 0;
-            if (n <= 1) return;
-
-            const spanDays = computeSpanDays(labels);
-            let startPct = 0;
-            let endPct = 100;
-
-            if (spanDays !== null) {{
-                const windowDays = Math.min(spanDays, VISIBLE_DAYS);
-                startPct = ((spanDays - windowDays) / spanDays) * 100;
-                endPct = 100;
-            }} else {{
-                const windowPoints = Math.min(n, VISIBLE_DAYS);
-                startPct = ((n - windowPoints) / n) * 100;
-                endPct = 100;
-            }}
-
-            if (Array.isArray(option.dataZoom)) {{
-                for (const dz of option.dataZoom) {{
-                    dz.start = startPct;
-                    dz.end = endPct;
-                }}
-            }}
-        }}
-
-        setInitialWindow();
-        chart.setOption(option);
-        window.addEventListener('resize', () => {{
-            chart.resize();
-        }});
-    </script>
-</body>
-</html>
-"""
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+    if interaction == "zoom":
+        tail = _zoom_tail(int(initial_window_days))
+    else:
+        tail = _HTML_TAIL_FIT
+    # The page is assembled in memory and handed over in one write call (one
+    # syscall for a regular file) instead of several small buffered writes.
+    page = b"".join((_HTML_HEAD, _encode_option(option), tail))
+    with open(output_path, "wb") as f:
+        f.write(page)
@@ -1,20 +1,46 @@
 from __future__ import annotations
 
 import logging
+import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 from typing import Any, Callable
 
+from .ratelimit import TokenBucket
 from .storage import read_json, write_json
 
+try:
+    import requests
+except ImportError:  # Shipped with garminconnect; only the network checks need it.
+    requests = None
+
+
+# Synced files are read by the app, not by people: written compact unless
+# GARMIN_DEBUG_JSON is set (indentation roughly doubles size and encode time).
+_JSON_INDENT: int | None = 2 if os.getenv("GARMIN_DEBUG_JSON") else None
+
 
 @dataclass(frozen=True)
 class SyncConfig:
     max_activity_pages: int = 20
     page_size: int = 50
     days_back: int = 1460
-    sleep_seconds: float = 0.6
+    # Token bucket shared by every Garmin HTTP attempt of a sync (pages, activity
+    # extras, health endpoints, signature probes and retries): bursts are served
+    # immediately, callers only wait once the budget is exhausted. Garmin does not
+    # publish a limit; 4 req/s is what the old serial loop (0.6 s pause per item)
+    # sent at ~0.2 s latency, so the pool is never more aggressive than it was.
+    requests_per_second: float = 4.0
+    requests_burst: int = 5
+    # Concurrent per-activity / per-day fetches. Each request takes its own token,
+    # so the pool stays within requests_per_second; workers only overlap latency.
+    fetch_workers: int = 4
+    # Health days: checkpoint the daily file every N newly stored days so an
+    # interrupted first sync keeps what it already downloaded.
+    health_flush_every: int = 60
 
 
 class GarminSyncService:
@@ -29,6 +55,7 @@ class GarminSyncService:
         self._user_id = user_id
         self._data_dir = data_dir
         self._config = config or SyncConfig()
+        self._limiter = TokenBucket(self._config.requests_per_second, self._config.requests_burst)
 
     # -------- Introspection --------
 
@@ -45,18 +72,19 @@ class GarminSyncService:
         activities_path = f"{self._data_dir}/{self._user_id}_activities.json"
         existing_list = read_json(activities_path, [])
         existing: list[dict[str, Any]] = existing_list if isinstance(existing_list, list) else []
-        existing_ids: set[int] = set()
+        existing_ids: set[int] = {
+            a["activityId"] for a in existing if isinstance(a, dict) and isinstance(a.get("activityId"), int)
+        }
+        # The file is written sorted by _merge_activities, so the date range sits at
+        # its two ends: parse from each end up to the first dated activity only.
+        first_dt = next((dt for a in existing if isinstance(a, dict) and (dt := _parse_activity_datetime(a))), None)
+        last_dt = next(
+            (dt for a in reversed(existing) if isinstance(a, dict) and (dt := _parse_activity_datetime(a))), None
+        )
         existing_min_dt: datetime | None = None
-        for a in existing:
-            if not isinstance(a, dict):
-                continue
-            aid = a.get("activityId")
-            if isinstance(aid, int):
-                existing_ids.add(aid)
-
-            dt = _parse_activity_datetime(a)
-            if dt is not None:
-                existing_min_dt = dt if existing_min_dt is None else min(existing_min_dt, dt)
+        existing_max_dt: datetime | None = None
+        if first_dt is not None and last_dt is not None:
+            existing_min_dt, existing_max_dt = min(first_dt, last_dt), max(first_dt, last_dt)
 
         # If existing data doesn't reach the new cutoff (e.g. you previously synced 6 months
         # and now want 2 years), we must NOT stop early just because the first page overlaps.
@@ -66,7 +94,6 @@ class GarminSyncService:
             progress(0.0, "Récupération des activités…")
 
         new_activities: list[dict[str, Any]] = []
-        overlap_hits = 0
 
         get_activities = getattr(self._client, "get_activities", None)
         if not callable(get_activities):
@@ -79,21 +106,28 @@ class GarminSyncService:
                     min(55.0, (page / max(1, self._config.max_activity_pages)) * 55.0),
                     f"Récupération des activités… page {page + 1}",
                 )
-            raw_batch = get_activities(start, self._config.page_size)
+            # Pages share the token bucket: a healthy sync runs within the burst
+            # without idling, throttling (429) is backed off in _with_retry.
+            raw_batch = _with_retry(lambda: get_activities(start, self._config.page_size), self._limiter)
             raw_list = raw_batch if isinstance(raw_batch, list) else []
             batch: list[dict[str, Any]] = [x for x in raw_list if isinstance(x, dict)]
             if not batch:
                 break
 
+            # Garmin returns newest -> oldest: once a page reaches the newest start time
+            # we already have, every following page only holds known summaries.
+            reached_known = False
             for a in batch:
+                if existing_max_dt is not None:
+                    dt = _parse_activity_datetime(a)
+                    if dt is not None and dt <= existing_max_dt:
+                        reached_known = True
                 aid = a.get("activityId")
                 if isinstance(aid, int) and aid in existing_ids:
-                    overlap_hits += 1
                     continue
                 new_activities.append(a)
 
-            # Fast-path: if first page contains no new activities, stop early.
-            if (not need_backfill) and page == 0 and existing_ids and not new_activities and overlap_hits >= int(0.8 * len(batch)):
+            if (not need_backfill) and reached_known:
                 break
 
             # stop early if last activity is older than cutoff
@@ -102,15 +136,13 @@ class GarminSyncService:
             if dt and dt < cutoff:
                 break
 
-            # If we see enough already-known activities, we reached the overlap zone.
-            if (not need_backfill) and overlap_hits >= 25:
-                break
-
-            time.sleep(self._config.sleep_seconds)
-
         merged = _merge_activities(new_activities, existing, cutoff=cutoff)
 
-        write_json(activities_path, merged, indent=4)
+        # No-op sync (nothing new, nothing aged out, already sorted): skip the
+        # rewrite. merged reuses the dicts read from the file, so this is an
+        # O(n) identity walk, cheaper than hashing the encoded list.
+        if new_activities or merged != existing or not os.path.exists(activities_path):
+            write_json(activities_path, merged, indent=_JSON_INDENT)
 
         if progress:
             progress(60.0, f"Activités: {len(new_activities)} nouvelles (merge en cours)…")
@@ -122,37 +154,33 @@ class GarminSyncService:
         activities_map_raw = details_dict.get("activities")
         activities_map: dict[str, Any] = activities_map_raw if isinstance(activities_map_raw, dict) else {}
 
-        # Sync details for new activities only (plus any missing details for merged set)
-        to_enrich: list[dict[str, Any]] = []
-        for a in merged:
-            aid = a.get("activityId")
-            if aid is None:
-                continue
-            key = str(aid)
-            if key in activities_map:
-                continue
-
-            to_enrich.append(a)
-
-        total = len(to_enrich)
-        for idx, a in enumerate(to_enrich):
-            aid = a.get("activityId")
-            if aid is None:
-                continue
-            key = str(aid)
-
-            if progress and total:
-                progress(
-                    60.0 + (idx / total) * 40.0,
-                    f"Détails activités… {idx + 1}/{total}",
-                )
+        # Sync details for new activities only (plus any missing details for merged set).
+        # _merge_activities only keeps int ids, so activityId is always set here.
+        to_enrich: list[dict[str, Any]] = [a for a in merged if str(a["activityId"]) not in activities_map]
 
+        def enrich(a: dict[str, Any]) -> dict[str, Any]:
             bundle: dict[str, Any] = {"summary": a}
-            bundle.update(self._fetch_activity_extras(aid))
-            activities_map[key] = bundle
-            time.sleep(self._config.sleep_seconds)
+            bundle.update(self._fetch_activity_extras(a["activityId"]))
+            return bundle
 
-        write_json(details_path, {"activities": activities_map}, indent=2)
+        # I/O-bound fetches run on a small pool; results (and progress) are
+        # handled here on the calling thread, so activities_map needs no lock.
+        total = len(to_enrich)
+        if total:
+            with ThreadPoolExecutor(max_workers=max(1, self._config.fetch_workers)) as pool:
+                futures = {pool.submit(enrich, a): str(a["activityId"]) for a in to_enrich}
+                for done, fut in enumerate(as_completed(futures), start=1):
+                    activities_map[futures[fut]] = fut.result()
+                    if progress:
+                        progress(
+                            60.0 + (done / total) * 40.0,
+                            f"Détails activités… {done}/{total}",
+                        )
+
+            # Raw Garmin bundles are by far the largest files: only rewrite them
+            # when something was added. An unchanged rewrite costs the whole
+            # file, and the new mtime makes every reader parse it again.
+            write_json(details_path, {"activities": activities_map}, indent=_JSON_INDENT)
 
         if progress:
             progress(100.0, "Activités synchronisées")
@@ -162,13 +190,13 @@ class GarminSyncService:
     def _fetch_activity_extras(self, activity_id: Any) -> dict[str, Any]:
         out: dict[str, Any] = {}
 
-        out["details"] = _maybe_call(self._client, "get_activity_details", activity_id)
+        out["details"] = _maybe_call(self._client, "get_activity_details", activity_id, limiter=self._limiter)
 
         # Optional extras (method names vary by garminconnect version)
-        out["splits"] = _maybe_call(self._client, "get_activity_splits", activity_id)
-        out["typed_splits"] = _maybe_call(self._client, "get_activity_typed_splits", activity_id)
-        out["hr_zones"] = _maybe_call(self._client, "get_activity_hr_in_timezones", activity_id)
-        out["laps"] = _maybe_call(self._client, "get_activity_laps", activity_id)
+        out["splits"] = _maybe_call(self._client, "get_activity_splits", activity_id, limiter=self._limiter)
+        out["typed_splits"] = _maybe_call(self._client, "get_activity_typed_splits", activity_id, limiter=self._limiter)
+        out["hr_zones"] = _maybe_call(self._client, "get_activity_hr_in_timezones", activity_id, limiter=self._limiter)
+        out["laps"] = _maybe_call(self._client, "get_activity_laps", activity_id, limiter=self._limiter)
 
         # Drop empty keys to keep file readable
         return {k: v for k, v in out.items() if v not in (None, {}, [], "")}
@@ -194,31 +222,46 @@ class GarminSyncService:
         if progress:
             progress(0.0, f"Santé: {len(missing)} jour(s) à synchroniser…")
 
+        # Same pattern as the activity details: pooled fetches, results merged
+        # on this thread. Each HTTP attempt of a day takes its own token (see
+        # _fetch_health_day), so the pool never exceeds requests_per_second.
+        # Writes are coalesced: a checkpoint once health_flush_every new days are
+        # pending, the rest at the end, and nothing at all when no day was added
+        # (days without data stay "missing" and are retried on every sync).
         saved = 0
+        pending = 0
         total = len(missing)
-        for idx, d in enumerate(missing):
-            key = d.isoformat()
-            if progress and total:
-                progress(min(90.0, (idx / total) * 90.0), f"Santé… {idx + 1}/{total} ({key})")
-
-            bundle = self._fetch_health_day(d)
-            if bundle:
-                days_map[key] = bundle
-                saved += 1
-
-            time.sleep(self._config.sleep_seconds)
-
-        write_json(days_path, {"days": days_map}, indent=2)
+        flush_every = max(1, self._config.health_flush_every)
+        if total:
+            with ThreadPoolExecutor(max_workers=max(1, self._config.fetch_workers)) as pool:
+                futures = {pool.submit(self._fetch_health_day, d): d.isoformat() for d in missing}
+                for done, fut in enumerate(as_completed(futures), start=1):
+                    key = futures[fut]
+                    bundle = fut.result()
+                    if bundle:
+                        days_map[key] = bundle
+                        saved += 1
+                        pending += 1
+                    if progress:
+                        progress(min(90.0, (done / total) * 90.0), f"Santé… {done}/{total} ({key})")
+                    if pending >= flush_every and done < total:
+                        write_json(days_path, {"days": days_map}, indent=_JSON_INDENT)
+                        pending = 0
+
+        if pending or not os.path.exists(days_path):
+            write_json(days_path, {"days": days_map}, indent=_JSON_INDENT)
 
         # Keep backward compatibility: write the legacy stats-only list used by GarminHealthManager
-        stats_list = []
-        for key, bundle in sorted(days_map.items()):
-            stats = bundle.get("stats")
-            if isinstance(stats, dict):
-                x = dict(stats)
-                x["date"] = key
-                stats_list.append(x)
-        write_json(f"{self._data_dir}/{self._user_id}_health.json", stats_list, indent=4)
+        legacy_path = f"{self._data_dir}/{self._user_id}_health.json"
+        if saved or not os.path.exists(legacy_path):
+            stats_list = []
+            for key, bundle in sorted(days_map.items()):
+                stats = bundle.get("stats")
+                if isinstance(stats, dict):
+                    x = dict(stats)
+                    x["date"] = key
+                    stats_list.append(x)
+            write_json(legacy_path, stats_list, indent=_JSON_INDENT)
 
         if progress:
             progress(100.0, "Santé synchronisée")
@@ -229,19 +272,19 @@ class GarminSyncService:
         bundle: dict[str, Any] = {}
 
         # Core day stats
-        stats = _call_with_date(self._client, "get_stats", d)
+        stats = _call_with_date(self._client, "get_stats", d, limiter=self._limiter)
         if isinstance(stats, dict) and stats:
             bundle["stats"] = stats
 
         # Optional health endpoints (best-effort)
-        bundle["sleep"] = _call_with_date(self._client, "get_sleep_data", d)
-        bundle["stress"] = _call_with_date(self._client, "get_stress_data", d)
-        bundle["steps"] = _call_with_date(self._client, "get_steps_data", d)
-        bundle["spo2"] = _call_with_date(self._client, "get_spo2_data", d)
-        bundle["respiration"] = _call_with_date(self._client, "get_respiration_data", d)
-        bundle["hydration"] = _call_with_date(self._client, "get_hydration_data", d)
-        bundle["wellness"] = _call_with_date(self._client, "get_wellness_data", d)
-        bundle["body_battery"] = _call_with_date(self._client, "get_body_battery", d)
+        bundle["sleep"] = _call_with_date(self._client, "get_sleep_data", d, limiter=self._limiter)
+        bundle["stress"] = _call_with_date(self._client, "get_stress_data", d, limiter=self._limiter)
+        bundle["steps"] = _call_with_date(self._client, "get_steps_data", d, limiter=self._limiter)
+        bundle["spo2"] = _call_with_date(self._client, "get_spo2_data", d, limiter=self._limiter)
+        bundle["respiration"] = _call_with_date(self._client, "get_respiration_data", d, limiter=self._limiter)
+        bundle["hydration"] = _call_with_date(self._client, "get_hydration_data", d, limiter=self._limiter)
+        bundle["wellness"] = _call_with_date(self._client, "get_wellness_data", d, limiter=self._limiter)
+        bundle["body_battery"] = _call_with_date(self._client, "get_body_battery", d, limiter=self._limiter)
 
         # remove empties
         bundle = {k: v for k, v in bundle.items() if v not in (None, {}, [], "")}
@@ -262,20 +305,25 @@ def _merge_activities(
 
     by_id: dict[int, dict[str, Any]] = {}
     ordered: list[dict[str, Any]] = []
+    # Start time parsed once per kept activity, reused as the sort key.
+    parsed: dict[int, datetime] = {}
 
     def consider(a: dict[str, Any]) -> None:
         if not isinstance(a, dict):
             return
-        dt = _parse_activity_datetime(a)
-        if dt and dt < cutoff:
-            return
+        # Cheap id checks first: duplicates and id-less items are never parsed.
         aid = a.get("activityId")
         if not isinstance(aid, int):
             return
         if aid in by_id:
             return
+        dt = _parse_activity_datetime(a)
+        if dt and dt < cutoff:
+            return
         by_id[aid] = a
         ordered.append(a)
+        if dt is not None:
+            parsed[aid] = dt
 
     # New items first (garmin returns newest -> oldest)
     for a in new_items:
@@ -284,7 +332,7 @@ def _merge_activities(
         consider(a)
 
     # Sort to guarantee stable newest-first output
-    ordered.sort(key=lambda x: (_parse_activity_datetime(x) or datetime.min), reverse=True)
+    ordered.sort(key=lambda x: parsed.get(x["activityId"]) or datetime.min, reverse=True)
     return ordered
 
 
@@ -295,18 +343,92 @@ def _date_range(start: date, end: date):
         cur = cur + timedelta(days=1)
 
 
-def _maybe_call(client: Any, method_name: str, *args: Any, **kwargs: Any) -> Any:
+_RETRY_ATTEMPTS = 4
+_RETRY_BASE_SECONDS = 2.0
+_RETRY_MAX_SECONDS = 30.0
+
+
+def _exc_status(exc: BaseException) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Rate limiting (429), server errors (5xx) and network hiccups are worth a retry.
+
+    garminconnect wraps garth's GarthHTTPError (the requests HTTPError sits in
+    its `.error`) and re-raises inside `except`, so the HTTP status can be a
+    few links down: `.error`, `__cause__` and `__context__` are followed too.
+    """
+    chain: list[BaseException] = [exc]
+    for cur in chain:
+        if isinstance(cur, (ConnectionError, TimeoutError)):
+            return True
+        if requests is not None and isinstance(
+            cur,
+            (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+            ),
+        ):
+            # Network-level RequestExceptions; HTTPError is decided by its status below.
+            return True
+        status = _exc_status(cur)
+        if status is not None:
+            # The first status found decides: a 4xx (auth, bad signature) is final.
+            return status == 429 or 500 <= status < 600
+        for link in (getattr(cur, "error", None), cur.__cause__, cur.__context__):
+            if isinstance(link, BaseException) and all(link is not c for c in chain):
+                chain.append(link)
+    return False
+
+
+def _with_retry(fn: Callable[[], Any], limiter: TokenBucket | None = None) -> Any:
+    """Call fn, retrying transient failures with jittered exponential backoff.
+
+    Other errors (auth, 4xx, unsupported signature) are raised immediately.
+    With a limiter, every attempt (first try and each retry) takes a token.
+    """
+    for attempt in range(_RETRY_ATTEMPTS):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if attempt + 1 >= _RETRY_ATTEMPTS or not _is_transient(e):
+                raise
+            delay = min(_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * (2**attempt))
+            delay = random.uniform(0, delay) + _RETRY_BASE_SECONDS / 2
+            logging.info("garmin transient error (%s), retry in %.1fs", e, delay)
+            time.sleep(delay)
+
+
+def _maybe_call(
+    client: Any, method_name: str, *args: Any, limiter: TokenBucket | None = None, **kwargs: Any
+) -> Any:
     fn = getattr(client, method_name, None)
     if not callable(fn):
         return None
     try:
-        return fn(*args, **kwargs)
+        return _with_retry(lambda: fn(*args, **kwargs), limiter)
     except Exception as e:
         logging.debug("garmin call failed %s: %s", method_name, e)
         return None
 
 
-def _call_with_date(client: Any, method_name: str, d: date) -> Any:
+# method name -> index of the date argument shape that last returned data.
+# The garminconnect version doesn't change within a process, so once a shape
+# works the signature-mismatch attempts before it can be skipped.
+_METHOD_SHAPE_CACHE: dict[str, int] = {}
+
+
+def _call_with_date(client: Any, method_name: str, d: date, *, limiter: TokenBucket | None = None) -> Any:
     fn = getattr(client, method_name, None)
     if not callable(fn):
         return None
@@ -318,13 +440,33 @@ def _call_with_date(client: Any, method_name: str, d: date) -> Any:
         lambda: fn(datetime(d.year, d.month, d.day).isoformat()),
     ]
 
-    for attempt in candidates:
+    known = _METHOD_SHAPE_CACHE.get(method_name)
+    if known is not None:
+        try:
+            out = _with_retry(candidates[known], limiter)
+            # The signature is right: an empty answer just means no data that day.
+            return out if out not in (None, {}, [], "") else None
+        except Exception as e:
+            if _is_transient(e):
+                # Throttled or down after every retry: the other shapes would
+                # only hit the same error, each with its own round of retries.
+                logging.debug("garmin call failed %s: %s", method_name, e)
+                return None
+            # Otherwise e.g. a different client object: probe every shape again
+
+    for idx, attempt in enumerate(candidates):
+        if idx == known:
+            continue
         try:
-            out = attempt()
+            out = _with_retry(attempt, limiter)
             if out not in (None, {}, [], ""):
+                _METHOD_SHAPE_CACHE[method_name] = idx
                 return out
-        except Exception:
-            continue
+        except Exception as e:
+            if _is_transient(e):
+                logging.debug("garmin call failed %s: %s", method_name, e)
+                return None
+            continue  # signature mismatch: try the next shape
     return None
 
 
@@ -333,7 +475,12 @@ def _parse_activity_datetime(activity: dict[str, Any]) -> datetime | None:
     if not raw or not isinstance(raw, str):
         return None
     try:
-        # Example: "2025-01-20 18:33:21" or ISO format
+        # Example: "2025-01-20 18:33:21" (Garmin's usual shape) or ISO format
+        if len(raw) == 19 and raw[4] == "-" and raw[7] == "-" and raw[13] == ":" and raw[16] == ":":
+            return datetime(
+                int(raw[0:4]), int(raw[5:7]), int(raw[8:10]),
+                int(raw[11:13]), int(raw[14:16]), int(raw[17:19]),
+            )
         raw_norm = raw.replace("Z", "")
         raw_norm = raw_norm.replace("T", " ")
         return datetime.fromisoformat(raw_norm)
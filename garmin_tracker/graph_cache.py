@@ -0,0 +1,64 @@
+"""Manifeste des graphes générés (.graph_cache.json) et ce qui sert à le valider."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from functools import lru_cache
+from typing import Any
+
+from .storage import _json_dump, _json_load
+
+
+GRAPH_CACHE_NAME = ".graph_cache.json"
+
+
+@lru_cache(maxsize=16)
+def graph_cache_path(output_dir: str) -> str:
+    return os.path.join(output_dir, GRAPH_CACHE_NAME)
+
+
+def read_graph_cache(output_dir: str) -> dict[str, Any] | None:
+    path = graph_cache_path(output_dir)
+    try:
+        with open(path, "rb") as f:
+            data = _json_load(f)
+        return data if isinstance(data, dict) else None
+    except Exception:
+        return None
+
+
+def write_graph_cache(output_dir: str, payload: dict[str, Any]) -> None:
+    path = graph_cache_path(output_dir)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            _json_dump(payload, f)
+    except Exception:
+        # Au mieux : un cache non écrit sera simplement recalculé.
+        pass
+
+
+def source_mtime(path: str) -> float:
+    try:
+        return float(os.path.getmtime(path))
+    except OSError:
+        return 0.0
+
+
+def source_hash(path: str) -> str:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    except OSError:
+        return ""
+
+
+@lru_cache(maxsize=1)
+def echarts_code_mtime() -> float:
+    # Stat une seule fois par processus : le code d'echarts chargé ne change
+    # pas sans redémarrage (ni le mtime qui le représente dans le cache).
+    try:
+        path = os.path.join(os.path.dirname(__file__), "echarts.py")
+        return float(os.path.getmtime(path))
+    except OSError:
+        return 0.0
@@ -1,71 +1,92 @@
 import os
 import json
-import time
 import logging
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import numpy as np
+import pandas as pd
 
 from typing import Any
 
 from .echarts import write_timeseries_chart_html
-
-
-def _graph_cache_path(output_dir: str) -> str:
-    return os.path.join(output_dir, ".graph_cache.json")
-
-
-def _read_graph_cache(output_dir: str) -> dict[str, Any] | None:
-    path = _graph_cache_path(output_dir)
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else None
-    except Exception:
-        return None
-
-
-def _write_graph_cache(output_dir: str, payload: dict[str, Any]) -> None:
-    path = _graph_cache_path(output_dir)
+from .graph_cache import (
+    GRAPH_CACHE_NAME,
+    echarts_code_mtime,
+    read_graph_cache,
+    source_hash,
+    source_mtime,
+    write_graph_cache,
+)
+from .numeric import ci95_scale, nan_to_none_list, rolling_mean_std
+from .ratelimit import TokenBucket
+from .storage import _json_load, append_json_list, write_json
+
+
+def _dir_names(output_dir: str) -> set[str]:
+    """Noms présents dans output_dir : un seul os.scandir sert à tout le contrôle de cache."""
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2, ensure_ascii=False)
-    except Exception:
-        pass
+        with os.scandir(output_dir) as it:
+            return {entry.name for entry in it}
+    except OSError:
+        return set()
 
 
-def _has_any_html(output_dir: str) -> bool:
-    try:
-        return any(name.endswith(".html") for name in os.listdir(output_dir))
-    except Exception:
+def _files_present(names: set[str], files: Any) -> bool:
+    """Tous les fichiers du manifeste de cache figurent-ils parmi les noms scannés ?"""
+    if not isinstance(files, list) or not files:
         return False
-
-
-def _clean_html(output_dir: str) -> None:
+    return all(name in names for name in files)
+
+
+def _clean_html(output_dir: str, names: set[str], files: Any = None) -> None:
+    # Manifeste du rendu précédent : on supprime exactement ces fichiers. Sans
+    # manifeste (premier rendu, ancien cache), tous les .html du scan.
+    if isinstance(files, list) and files:
+        targets = names.intersection(files)
+    else:
+        targets = [name for name in names if name.endswith(".html")]
+    for name in targets:
+        try:
+            os.unlink(os.path.join(output_dir, name))
+        except OSError:
+            pass
+
+
+# Libellé du graphe -> champ des stats journalières Garmin.
+_HEALTH_METRICS = {
+    "Body Battery": "bodyBatteryMostRecentValue",
+    "Calories Total": "totalKilocalories",
+    "Calories Active": "activeKilocalories",
+    "Heart Rate Resting": "restingHeartRate",
+    "Respiration Average": "avgWakingRespirationValue",
+    "SpO2 Average": "averageSpo2",
+    "Steps": "totalSteps",
+    "Stress Total": "totalStressDuration",
+}
+
+
+def _float_column(raw: list) -> np.ndarray:
     try:
-        for name in os.listdir(output_dir):
-            if name.endswith(".html"):
-                try:
-                    os.remove(os.path.join(output_dir, name))
-                except OSError:
-                    pass
-    except Exception:
-        pass
+        return np.array(raw, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Valeur non numérique quelque part : NaN pour celle-ci seulement.
+        out = np.full(len(raw), np.nan)
+        for i, v in enumerate(raw):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
 
 
-def _source_mtime(path: str) -> float:
-    try:
-        return float(os.path.getmtime(path))
-    except OSError:
-        return 0.0
+# Libellé du graphe -> fichier HTML écrit par plot_interactive_graphs.
+_HEALTH_FILES = {label: f"{label.replace(' ', '_').lower()}.html" for label in _HEALTH_METRICS}
 
 
-def _echarts_mtime() -> float:
-    try:
-        path = os.path.join(os.path.dirname(__file__), "echarts.py")
-        return float(os.path.getmtime(path))
-    except OSError:
-        return 0.0
+def _iso_dates(raw: list, unit: str) -> np.ndarray:
+    # Analyse ISO par pandas (même résultat quelle que soit la version de numpy),
+    # puis datetime64 à l'unité voulue : "us" garde l'heure, "D" la tronque au jour.
+    return pd.to_datetime(raw, format="ISO8601").values.astype(f"datetime64[{unit}]")
 
 
 class GarminHealthManager:
@@ -74,113 +95,169 @@ class GarminHealthManager:
         self.data_file = os.path.join("data", f"{self.user_id}_health.json")
         os.makedirs("data", exist_ok=True)
         self.health_data = health_data if isinstance(health_data, list) else self._load_data()
+        self._columns = None
 
     def _load_data(self):
         """Charge les données de santé depuis un fichier JSON."""
         if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
+            with open(self.data_file, 'rb') as f:
                 try:
-                    data = json.load(f)
+                    data = _json_load(f)
                     logging.info(f"Données de santé chargées depuis {self.data_file}.")
                     return data
                 except json.JSONDecodeError:
                     logging.warning(f"Fichier corrompu, réinitialisation : {self.data_file}.")
         return []
 
+    def _health_columns(self):
+        """Vue colonnes du JSON (construite une fois, reconstruite après update_data).
+
+        "date" -> datetime64, puis un tableau float64 par champ tracé.
+        """
+        if self._columns is None:
+            records = self.health_data
+            # Conversion groupée des dates ISO (une éventuelle heure est conservée).
+            columns = {"date": _iso_dates([h["date"] for h in records], "us")}
+            # None -> NaN : colonnes float64 prêtes pour rolling_mean_std, même
+            # quand une métrique manque tous les jours.
+            for field in _HEALTH_METRICS.values():
+                columns[field] = _float_column([h.get(field) for h in records])
+            self._columns = columns
+        return self._columns
+
     def _save_data(self):
         """Sauvegarde les données de santé dans un fichier JSON."""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.health_data, f, indent=4)
+        # Fichier temporaire + os.replace : jamais de JSON tronqué sur disque.
+        write_json(self.data_file, self.health_data, indent=4)
         logging.info(f"Données de santé sauvegardées dans {self.data_file}.")
 
     def find_missing_dates(self):
         """Trouve les dates manquantes pour les six derniers mois."""
-        start_date = datetime.now() - timedelta(days=1460)
-        end_date = datetime.now()
-        existing_dates = {datetime.fromisoformat(entry['date']).date() for entry in self.health_data}
-        all_dates = {start_date.date() + timedelta(days=n) for n in range((end_date - start_date).days + 1)}
-        return sorted(all_dates - existing_dates)
-
-    def update_data(self, client_handler):
+        today = np.datetime64(datetime.now().date(), "D")
+        all_dates = np.arange(today - np.timedelta64(1460, "D"), today + np.timedelta64(1, "D"))
+        # Conversion groupée des dates ISO (une éventuelle heure est tronquée au jour),
+        # puis comparaison sur les jours depuis l'epoch en int64.
+        existing_days = _iso_dates([entry['date'] for entry in self.health_data], "D").view(np.int64)
+        # all_dates est déjà trié et sans doublon : un masque isin évite le
+        # tri/unique de setdiff1d. Seuls les jours manquants deviennent des
+        # objets datetime.date, comme avant.
+        return all_dates[~np.isin(all_dates.view(np.int64), existing_days)].tolist()
+
+    def update_data(self, client_handler, max_workers: int = 4, requests_per_second: float = 1.0):
         """Met à jour les données de santé pour les dates manquantes."""
         missing_dates = self.find_missing_dates()
-        new_data = []
 
-        for single_date in missing_dates:
+        # Requêtes en parallèle, cadencées par un token bucket commun. Burst de 1 :
+        # au plus une requête par 1/requests_per_second, comme l'ancienne pause
+        # d'1 s entre deux jours ; les workers ne font que recouvrir la latence.
+        limiter = TokenBucket(requests_per_second, 1)
+
+        def fetch(single_date):
+            limiter.acquire()
             logging.info(f"Fetching health data for {single_date}.")
-            try:
-                health_data = client_handler.client.get_stats(single_date)
-                if health_data:
-                    health_data['date'] = single_date.isoformat()
-                    new_data.append(health_data)
-            except Exception as e:
-                logging.error(f"Erreur lors de la récupération des données de santé pour {single_date}: {e}")
-            time.sleep(1)
+            return client_handler.client.get_stats(single_date)
 
+        fetched = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(fetch, d): d for d in missing_dates}
+            for future in as_completed(futures):
+                single_date = futures[future]
+                try:
+                    health_data = future.result()
+                    if health_data:
+                        health_data['date'] = single_date.isoformat()
+                        fetched[single_date] = health_data
+                except Exception as e:
+                    logging.error(f"Erreur lors de la récupération des données de santé pour {single_date}: {e}")
+
+        # Ordre chronologique, comme avec la boucle séquentielle.
+        new_data = [fetched[d] for d in missing_dates if d in fetched]
         self.health_data.extend(new_data)
+        self._columns = None
         if new_data:
             logging.info(f"{len(new_data)} nouvelles données de santé ajoutées.")
         else:
             logging.info("Aucune nouvelle donnée de santé ajoutée.")
-        self._save_data()
+        if not os.path.exists(self.data_file):
+            self._save_data()
+            return
+        # Seuls les nouveaux jours sont sérialisés, en fin de tableau JSON (rien
+        # à écrire sans nouveau jour). Le remplacement est atomique : en cas
+        # d'échec le fichier d'origine est intact et on le réécrit en entier.
+        try:
+            append_json_list(self.data_file, new_data)
+        except (OSError, ValueError):
+            self._save_data()
+
+    def _graph_cache_fresh(
+        self, output_dir: str, cache: dict[str, Any] | None, src_mtime: float, echarts_mtime: float
+    ) -> bool:
+        """Les graphes de output_dir correspondent-ils au fichier de santé actuel ?"""
+        if (
+            not cache
+            or cache.get("source") != self.data_file
+            or float(cache.get("echarts_mtime") or 0.0) != echarts_mtime
+        ):
+            return False
+        if float(cache.get("source_mtime") or 0.0) == src_mtime:
+            return True
+
+        # Fichier réécrit à l'identique (_save_data après une sync sans nouveau
+        # jour) : même contenu, mêmes graphes. On met juste le mtime à jour.
+        src_hash = source_hash(self.data_file)
+        if not src_hash or cache.get("source_hash") != src_hash:
+            return False
+        write_graph_cache(output_dir, {**cache, "source_mtime": src_mtime})
+        return True
 
     def plot_interactive_graphs(self, output_dir):
         """Trace les graphiques interactifs (ECharts) pour les données de santé."""
         os.makedirs(output_dir, exist_ok=True)
 
-        src_mtime = _source_mtime(self.data_file)
-        echarts_mtime = _echarts_mtime()
-        cache = _read_graph_cache(output_dir)
-        if (
-            cache
-            and cache.get("source") == self.data_file
-            and float(cache.get("source_mtime") or 0.0) == src_mtime
-            and float(cache.get("echarts_mtime") or 0.0) == echarts_mtime
-            and _has_any_html(output_dir)
+        src_mtime = source_mtime(self.data_file)
+        echarts_mtime = echarts_code_mtime()
+        names = _dir_names(output_dir)
+        cache = read_graph_cache(output_dir) if GRAPH_CACHE_NAME in names else None
+        if self._graph_cache_fresh(output_dir, cache, src_mtime, echarts_mtime) and _files_present(
+            names, cache.get("files")
         ):
             return
 
-        _clean_html(output_dir)
+        _clean_html(output_dir, names, (cache or {}).get("files"))
 
-        six_months_ago = datetime.now() - timedelta(days=1460)
-        filtered_health_data = [h for h in self.health_data if datetime.fromisoformat(h["date"]) >= six_months_ago]
+        six_months_ago = np.datetime64(datetime.now() - timedelta(days=1460), "us")
+        columns = self._health_columns()
+        dates = columns["date"]
+        # Indices des jours retenus, calculés une fois pour les 9 colonnes ;
+        # historique entièrement dans la fenêtre : simple vue, sans copie.
+        keep = np.flatnonzero(dates >= six_months_ago)
+        if len(keep) == len(dates):
+            keep = slice(None)
+        dates = dates[keep]
 
-        if not filtered_health_data:
+        if not len(dates):
             logging.warning("Aucune donnée de santé valide des 4 dernières années pour tracer les graphiques.")
             return
 
-        dates = [datetime.fromisoformat(h["date"]) for h in filtered_health_data]
-        metrics = {
-            "Body Battery": [h.get("bodyBatteryMostRecentValue") for h in filtered_health_data],
-            "Calories Total": [h.get("totalKilocalories") for h in filtered_health_data],
-            "Calories Active": [h.get("activeKilocalories") for h in filtered_health_data],
-            "Heart Rate Resting": [h.get("restingHeartRate") for h in filtered_health_data],
-            "Respiration Average": [h.get("avgWakingRespirationValue") for h in filtered_health_data],
-            "SpO2 Average": [h.get("averageSpo2") for h in filtered_health_data],
-            "Steps": [h.get("totalSteps") for h in filtered_health_data],
-            "Stress Total": [h.get("totalStressDuration") for h in filtered_health_data],
-        }
-
-        data = pd.DataFrame({"Date": dates, **metrics})
-        data.set_index("Date", inplace=True)
-
-        for col in data.columns:
-            data[f"{col}_MA"] = data[col].rolling(window=14, min_periods=1).mean()
-            data[f"{col}_Std"] = data[col].rolling(window=14, min_periods=1).std()
-            data[f"{col}_CI"] = 1.96 * (data[f"{col}_Std"] / np.sqrt(14))
+        # Toutes les métriques en une passe : matrice (N jours, 8 métriques).
+        values = np.column_stack([columns[field][keep] for field in _HEALTH_METRICS.values()])
+        ma, std = rolling_mean_std(values, 14)
+        # Bande de confiance à 95 % de la moyenne glissante sur 14 jours.
+        ci = std * ci95_scale(14)
 
         # App theme accent color
         color = "#4CC9F0"
 
-        x = [d.date().isoformat() for d in data.index]
+        x = np.datetime_as_string(dates, unit="D").tolist()
 
-        for metric in metrics.keys():
-            y = [None if pd.isna(v) else float(v) for v in data[metric].tolist()]
-            y_ma = [None if pd.isna(v) else float(v) for v in data[f"{metric}_MA"].tolist()]
-            y_ci = [None if pd.isna(v) else float(v) for v in data[f"{metric}_CI"].tolist()]
+        # Une conversion par matrice (transposée : une liste par métrique).
+        y_all = nan_to_none_list(values.T)
+        y_ma_all = nan_to_none_list(ma.T)
+        y_ci_all = nan_to_none_list(ci.T)
 
+        for metric, y, y_ma, y_ci in zip(_HEALTH_METRICS, y_all, y_ma_all, y_ci_all):
             write_timeseries_chart_html(
-                os.path.join(output_dir, f"{metric.replace(' ', '_').lower()}.html"),
+                os.path.join(output_dir, _HEALTH_FILES[metric]),
                 title=f"{metric} (4 dernières années)",
                 x=x,
                 y=y,
@@ -190,13 +267,15 @@ class GarminHealthManager:
                 y_ci=y_ci,
             )
 
-        _write_graph_cache(
+        write_graph_cache(
             output_dir,
             {
                 "engine": "echarts",
                 "source": self.data_file,
                 "source_mtime": src_mtime,
+                "source_hash": source_hash(self.data_file),
                 "echarts_mtime": echarts_mtime,
+                "files": list(_HEALTH_FILES.values()),
             },
         )
 
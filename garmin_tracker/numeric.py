@@ -0,0 +1,62 @@
+"""NumPy helpers shared by the activity and health charts."""
+
+from __future__ import annotations
+
+import math
+from typing import Any
+
+import numpy as np
+
+
+def ci95_scale(window: int) -> float:
+    """Half-width factor of the 95% band of a `window`-point rolling mean: 1.96 / sqrt(window)."""
+    return 1.96 / math.sqrt(window)
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rolling mean and sample std (ddof=1) in one pass, NaN-aware.
+
+    Same semantics as ``rolling(window, min_periods=1).mean()`` / ``.std()``
+    (std is NaN until two valid points are in the window), but computed from
+    a single set of cumulative sums instead of two pandas window scans.
+    Values are centered first to limit cancellation in the variance.
+
+    ``values`` is one series (N,) or several stacked as columns (N, K); the
+    window runs along axis 0 and every column is handled in the same pass.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = x.shape[0]
+    valid = ~np.isnan(x)
+
+    # Per-column mean of the valid values (0 for an all-NaN column).
+    n_valid = valid.sum(axis=0)
+    shift = np.where(valid, x, 0.0).sum(axis=0) / np.maximum(n_valid, 1)
+    x0 = np.where(valid, x - shift, 0.0)
+    lo = np.maximum(np.arange(1, n + 1) - window, 0)
+
+    def window_sum(a: np.ndarray) -> np.ndarray:
+        c = np.concatenate((np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)))
+        return c[1:] - c[lo]
+
+    count = window_sum(valid.astype(np.float64))
+    s1 = window_sum(x0)
+    s2 = window_sum(x0 * x0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, s1 / count + shift, np.nan)
+        var = np.where(count > 1, (s2 - s1 * s1 / count) / (count - 1), np.nan)
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+def nan_to_none_list(s: Any) -> list:
+    """JSON-ready list of floats, NaN mapped to None (a 2-D array gives one list per row).
+
+    Accepts a numpy array or a pandas Series (anything with ``to_numpy``).
+    """
+    if hasattr(s, "to_numpy"):
+        a = s.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        a = np.asarray(s, dtype=np.float64)
+    out = a.astype(object)
+    out[np.isnan(a)] = None
+    return out.tolist()
@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import threading
 from dataclasses import dataclass
 from typing import Any
 
-from .storage import read_json, write_json
+from .storage import _json_loads, write_json
 
 
 @dataclass
 class _CacheEntry:
     mtime: float
+    size: int
+    digest: bytes
     value: Any
 
 
+def _digest(raw: bytes) -> bytes:
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
 class JsonRepository:
     """Small in-memory cache on top of JSON files.
 
@@ -33,18 +40,38 @@ class JsonRepository:
 
     def _get_cached(self, key: str, path: str, default: Any) -> Any:
         try:
-            mtime = os.path.getmtime(path)
+            st = os.stat(path)
+            mtime, size = st.st_mtime, st.st_size
         except OSError:
-            mtime = -1
+            mtime, size = -1, -1
 
         with self._lock:
             hit = self._cache.get(key)
-            if hit and hit.mtime == mtime:
+            if hit and hit.mtime == mtime and hit.size == size:
                 return hit.value
 
-        value = read_json(path, default)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            raw = None
+
+        digest = _digest(raw) if raw is not None else b""
+        # Same size, new mtime (rewritten with identical content, e.g. a no-op
+        # save or a copy): the content hash confirms it, skip the parse.
+        if hit and raw is not None and hit.size == len(raw) and hit.digest == digest:
+            with self._lock:
+                self._cache[key] = _CacheEntry(mtime=mtime, size=size, digest=digest, value=hit.value)
+            return hit.value
+
+        value = default
+        if raw is not None:
+            try:
+                value = _json_loads(raw)
+            except Exception:
+                value = default
         with self._lock:
-            self._cache[key] = _CacheEntry(mtime=mtime, value=value)
+            self._cache[key] = _CacheEntry(mtime=mtime, size=size, digest=digest, value=value)
         return value
 
     def activities(self, user_id: str) -> list[dict[str, Any]]:
@@ -1,30 +1,80 @@
 from __future__ import annotations
 
 import json
+import mmap
 import os
+import shutil
 import tempfile
 from typing import Any
 
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json is used when orjson isn't installed.
+    orjson = None
+
+
+def _json_dumps(data: Any, *, indent: int | None = 2) -> bytes:
+    # orjson only knows 2-space indentation; the fallback keeps `indent`.
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=indent, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(raw: bytes | str) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError.
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _json_load(f) -> Any:
+    """Parse a text- or binary-mode file."""
+    return _json_loads(f.read())
+
+
+def _json_load_mapped(f) -> Any:
+    """Parse a binary-mode file through a read-only mmap when orjson can take it.
+
+    orjson reads the mapped pages directly: no bytes copy of the whole file.
+    Empty files (mmap refuses 0 bytes) and the stdlib fallback use read().
+    """
+    if orjson is None:
+        return _json_load(f)
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return _json_load(f)
+    with mm, memoryview(mm) as view:
+        return orjson.loads(view)
+
+
+def _json_dump(data: Any, f, *, indent: int | None = 2) -> None:
+    """Write data to a text-mode file."""
+    f.write(_json_dumps(data, indent=indent).decode("utf-8"))
+
 
 def read_json(path: str, default: Any) -> Any:
     if not os.path.exists(path):
         return default
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return _json_load_mapped(f)
     except Exception:
         return default
 
 
-def write_json(path: str, data: Any, *, indent: int = 2) -> None:
+def write_json(path: str, data: Any, *, indent: int | None = 2) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
 
     # Atomic write (best effort on Windows)
     dir_name = os.path.dirname(path) or "."
     fd, tmp_path = tempfile.mkstemp(prefix="._tmp_", suffix=".json", dir=dir_name)
     try:
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=indent, ensure_ascii=False)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_json_dumps(data, indent=indent))
         os.replace(tmp_path, path)
     finally:
         try:
@@ -32,3 +82,50 @@ def write_json(path: str, data: Any, *, indent: int = 2) -> None:
                 os.remove(tmp_path)
         except Exception:
             pass
+
+
+def append_json_list(path: str, items: list[Any]) -> None:
+    """Append items to the JSON array stored at path, serializing only the new items.
+
+    The existing bytes are copied as is into a temp file, the closing bracket
+    is replaced there by one compact record per line, and the temp file is
+    swapped in with os.replace, as in write_json: readers and crashes never see
+    a half-written array. Raises ValueError when the file doesn't end like an
+    array; the file is then left untouched and the caller rewrites it.
+    """
+    if not items:
+        return
+    if not os.path.exists(path):
+        write_json(path, list(items))
+        return
+    body = b",\n".join(_json_dumps(item, indent=None) for item in items)
+    dir_name = os.path.dirname(path) or "."
+    with open(path, "rb") as src:
+        size = src.seek(0, os.SEEK_END)
+        start = max(0, size - 4096)
+        src.seek(start)
+        tail = src.read().rstrip()
+        if not tail.endswith(b"]"):
+            raise ValueError(f"not a JSON array: {path}")
+        before = tail[:-1].rstrip()
+        if not before and start:
+            raise ValueError(f"closing bracket not found: {path}")
+        # "[" right before "]": empty array, no comma.
+        sep = b"\n" if before.endswith(b"[") else b",\n"
+        close = start + len(tail) - 1
+
+        fd, tmp_path = tempfile.mkstemp(prefix="._tmp_", suffix=".json", dir=dir_name)
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                src.seek(0)
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+                dst.seek(close)
+                dst.write(sep + body + b"\n]\n")
+                dst.truncate()
+            os.replace(tmp_path, path)
+        finally:
+            try:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            except Exception:
+                pass
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import heapq
 import threading
 import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Callable, Optional
 
 
@@ -18,6 +19,8 @@ class TaskStatus:
     error: Optional[str] = None
     started_at: float = 0.0
     finished_at: Optional[float] = None
+    # Guards the progress/state fields; TaskManager._lock only guards the dict.
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
 
 
 class TaskManager:
@@ -25,6 +28,8 @@ class TaskManager:
         self._ttl_seconds = ttl_seconds
         self._lock = threading.Lock()
         self._tasks: dict[str, TaskStatus] = {}
+        # (expires_at, task_id), oldest first: cleanup only touches expired heads.
+        self._expiry: list[tuple[float, str]] = []
 
     def start(self, *, kind: str, user_id: str, target: Callable[[Callable[[float, str], None]], None]) -> str:
         task_id = uuid.uuid4().hex
@@ -33,31 +38,38 @@ class TaskManager:
         def set_progress(p: float, msg: str) -> None:
             with self._lock:
                 s = self._tasks.get(task_id)
-                if not s or s.state != "running":
+            if not s:
+                return
+            with s._lock:
+                if s.state != "running":
                     return
                 s.percent = max(0.0, min(100.0, float(p)))
                 s.message = msg
 
+        def finish(state: str, error: Optional[str] = None) -> None:
+            with self._lock:
+                s = self._tasks.get(task_id)
+            if not s:
+                return
+            with s._lock:
+                s.state = state
+                s.error = error
+                s.finished_at = time.time()
+            with self._lock:
+                heapq.heappush(self._expiry, (s.finished_at + self._ttl_seconds, task_id))
+
         def runner() -> None:
             try:
                 set_progress(0.0, "Démarrage…")
                 target(set_progress)
                 set_progress(100.0, "Terminé")
-                with self._lock:
-                    s = self._tasks.get(task_id)
-                    if s:
-                        s.state = "done"
-                        s.finished_at = time.time()
+                finish("done")
             except Exception as e:
-                with self._lock:
-                    s = self._tasks.get(task_id)
-                    if s:
-                        s.state = "error"
-                        s.error = str(e)
-                        s.finished_at = time.time()
+                finish("error", str(e))
 
         with self._lock:
             self._tasks[task_id] = status
+            heapq.heappush(self._expiry, (status.started_at + self._ttl_seconds, task_id))
 
         thread = threading.Thread(target=runner, name=f"task-{kind}-{task_id}", daemon=True)
         thread.start()
@@ -71,8 +83,12 @@ class TaskManager:
             return self._tasks.get(task_id)
 
     def cleanup(self) -> None:
-        cutoff = time.time() - self._ttl_seconds
+        now = time.time()
         with self._lock:
-            to_delete = [tid for tid, s in self._tasks.items() if (s.finished_at or s.started_at) < cutoff]
-            for tid in to_delete:
-                self._tasks.pop(tid, None)
+            while self._expiry and self._expiry[0][0] < now:
+                _, tid = heapq.heappop(self._expiry)
+                s = self._tasks.get(tid)
+                # A task that finished since its start entry was pushed has a
+                # later entry in the heap: only evict on its current deadline.
+                if s and (s.finished_at or s.started_at) + self._ttl_seconds < now:
+                    del self._tasks[tid]
@@ -1,7 +1,8 @@
 import logging
-import json
 import os
 
+from .storage import _json_dump, _json_load
+
 
 class TrainingAnalysis:
     def __init__(self, activity_manager, health_manager):
@@ -17,8 +18,8 @@ class TrainingAnalysis:
             return
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                self.competitions = json.load(f)
+            with open(file_path, "rb") as f:
+                self.competitions = _json_load(f)
             logging.info(f"Compétitions chargées depuis {file_path}.")
         except Exception as e:
             logging.error(f"Erreur lors du chargement des compétitions : {e}")
@@ -28,7 +29,7 @@ class TrainingAnalysis:
         """Sauvegarde les compétitions dans un fichier JSON."""
         try:
             with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(self.competitions, f, indent=4)
+                _json_dump(self.competitions, f, indent=4)
             logging.info(f"Compétitions sauvegardées dans {file_path}.")
         except Exception as e:
             logging.error(f"Erreur lors de la sauvegarde des compétitions : {e}")
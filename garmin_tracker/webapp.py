@@ -13,10 +13,11 @@ import unicodedata
 import secrets
 import shutil
 
-from flask import Flask, flash, jsonify, redirect, render_template, request, session, url_for
+import numpy as np
+from flask import Flask, flash, g, jsonify, redirect, render_template, request, session, url_for
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from passlib.hash import argon2
+from argon2 import PasswordHasher
 
 from .activity_manager import GarminActivityManager, _generate_pace_ticks
 from .client_manager import GarminClientHandler, GarminLoginError
@@ -127,6 +128,13 @@ def _normalize_pin(pin: str) -> str | None:
     return p
 
 
+# OWASP Password Storage Cheat Sheet, Argon2id m=46 MiB, t=1, p=1 (its
+# equivalent alternative is m=19 MiB, t=2). passlib's defaults (64 MiB, t=3,
+# p=4) dominated login/register latency. Hashes made with other parameters
+# still verify and are rehashed on the next successful login.
+_PIN_HASHER = PasswordHasher(time_cost=1, memory_cost=46 * 1024, parallelism=1, hash_len=32, salt_len=16)
+
+
 def _db_get_user_by_email(email: str) -> User | None:
     try:
         with db_session() as db:
@@ -157,7 +165,7 @@ def _db_set_user_pin(*, user_id: str, pin: str) -> bool:
             u = db.execute(select(User).where(User.user_id == user_id)).scalar_one_or_none()
             if not u:
                 return False
-            u.pin_hash = argon2.hash(pin)
+            u.pin_hash = _PIN_HASHER.hash(pin)
             return True
     except SQLAlchemyError:
         return False
@@ -177,7 +185,7 @@ def _db_delete_user(*, user_id: str) -> bool:
 
 def _db_create_user(*, email: str, pin: str, pseudo: str) -> User:
     user_id = _normalize_user_id_from_pseudo(pseudo)
-    u = User(email=email, display_name=pseudo, user_id=user_id, pin_hash=argon2.hash(pin))
+    u = User(email=email, display_name=pseudo, user_id=user_id, pin_hash=_PIN_HASHER.hash(pin))
     ga = GarminAccount(garmin_email=email)
     u.garmin_account = ga
     with db_session() as db:
@@ -190,9 +198,14 @@ def _db_verify_user(*, email: str, pin: str) -> User | None:
     if not u:
         return None
     try:
-        ok = argon2.verify(pin, u.pin_hash)
+        ok = _PIN_HASHER.verify(u.pin_hash, pin)
     except Exception:
+        # VerifyMismatchError, or a stored hash that can't be parsed.
         ok = False
+    if ok and _PIN_HASHER.check_needs_rehash(u.pin_hash):
+        # Older, heavier hash: store one with the current parameters so the
+        # next logins pay the cheaper verify.
+        _db_set_user_pin(user_id=u.user_id, pin=pin)
     return u if ok else None
 
 
@@ -270,8 +283,16 @@ def create_app() -> Flask:
     tasks = TaskManager()
 
     def current_creds() -> GarminCredentials | None:
+        # Resolved once per request (g is per request) and shared by
+        # require_login/require_admin, the view and inject_user_context.
+        # Keyed by token: a login/logout during the request re-resolves.
         token = session.get(_SESSION_KEY)
-        return creds_store.get(token)
+        cached = g.get("_creds_cache")
+        if cached is not None and cached[0] == token:
+            return cached[1]
+        creds = creds_store.get(token)
+        g._creds_cache = (token, creds)
+        return creds
 
     def require_creds() -> GarminCredentials:
         creds = current_creds()
@@ -287,6 +308,15 @@ def create_app() -> Flask:
     def _is_admin(creds: GarminCredentials | None) -> bool:
         if not creds:
             return False
+        # One users lookup per request, however many times the templates and
+        # require_admin ask.
+        cache = g.setdefault("_is_admin_cache", {})
+        user_id = str(creds.user_id)
+        if user_id not in cache:
+            cache[user_id] = _lookup_is_admin(creds)
+        return cache[user_id]
+
+    def _lookup_is_admin(creds: GarminCredentials) -> bool:
         try:
             with db_session() as session:
                 user = (
@@ -707,16 +737,23 @@ def create_app() -> Flask:
     _garmin_lock = threading.Lock()
     _garmin_cache: dict[str, tuple[GarminClientHandler, float]] = {}
 
-    def build_garmin_handler(creds: GarminCredentials) -> GarminClientHandler:
+    def build_garmin_handler(creds: GarminCredentials, password: str | None = None) -> GarminClientHandler:
+        # One logged-in client per user, shared by every sync path: the Garmin
+        # login (SSO + OAuth exchange) costs far more than the sync itself.
+        password = creds.password if password is None else password
         now = time.time()
         with _garmin_lock:
             hit = _garmin_cache.get(creds.user_id)
             if hit:
                 handler, expires_at = hit
-                if now < expires_at and getattr(handler, "client", None) is not None:
+                if (
+                    now < expires_at
+                    and getattr(handler, "client", None) is not None
+                    and handler.password == password
+                ):
                     return handler
 
-        handler = GarminClientHandler(creds.email, creds.password, creds.user_id)
+        handler = GarminClientHandler(creds.email, password, creds.user_id)
         handler.login()
         with _garmin_lock:
             _garmin_cache[creds.user_id] = (handler, now + 20 * 60)
@@ -2041,23 +2078,43 @@ def create_app() -> Flask:
                     idx[str(k)] = mi
             return idx
 
-        def _collect_series(rows: list[dict[str, Any]], idx: int | None) -> list[float | None]:
+        def _metrics_matrix(rows: list[dict[str, Any]]) -> np.ndarray:
+            """Pack activityDetailMetrics[*].metrics into one float matrix (None -> NaN).
+
+            Built once per request; every chart series is then a column slice instead
+            of a separate Python walk over all rows.
+            """
+
+            raw = [r.get("metrics") if isinstance(r.get("metrics"), list) else [] for r in rows]
+            if not raw:
+                return np.empty((0, 0), dtype=np.float64)
+            try:
+                # Rectangular rows of numbers/None: single C-level conversion.
+                return np.array(raw, dtype=np.float64).reshape(len(raw), -1)
+            except (TypeError, ValueError):
+                width = max(len(m) for m in raw)
+                out = np.full((len(raw), width), np.nan, dtype=np.float64)
+                for i, m in enumerate(raw):
+                    for j, v in enumerate(m):
+                        f = _safe_float(v)
+                        if f is not None:
+                            out[i, j] = f
+                return out
+
+        def _collect_series(matrix: np.ndarray, idx: int | None) -> list[float | None]:
             if idx is None:
                 return []
-            out: list[float | None] = []
-            for r in rows:
-                metrics = r.get("metrics") if isinstance(r, dict) else None
-                if not isinstance(metrics, list) or idx >= len(metrics):
-                    out.append(None)
-                    continue
-                out.append(_safe_float(metrics[idx]))
-            return out
+            if idx >= matrix.shape[1]:
+                return [None] * matrix.shape[0]
+            col = matrix[:, idx]
+            return np.where(np.isnan(col), None, col).tolist()
 
         activity_graphs: list[dict[str, str]] = []
         graph_urls: list[str] = []
         if isinstance(details_dict, dict):
             rows_raw = details_dict.get("activityDetailMetrics")
             rows = [r for r in rows_raw if isinstance(r, dict)] if isinstance(rows_raw, list) else []
+            matrix = _metrics_matrix(rows)
             idx_map = _build_index_map()
 
             # Prefer elapsed time for x-axis.
@@ -2065,13 +2122,13 @@ def create_app() -> Flask:
             ts_idx = idx_map.get("directTimestamp")
             x: list[str] = []
             if rows and elapsed_idx is not None:
-                elapsed = _collect_series(rows, elapsed_idx)
+                elapsed = _collect_series(matrix, elapsed_idx)
                 x = [_format_hms(v) if isinstance(v, (int, float)) else "" for v in elapsed]
             elif rows and ts_idx is not None:
                 # directTimestamp seems to be ms epoch. Keep it simple: show hh:mm:ss from epoch.
                 import datetime as _dt
 
-                ts = _collect_series(rows, ts_idx)
+                ts = _collect_series(matrix, ts_idx)
                 for v in ts:
                     if v is None:
                         x.append("")
@@ -2129,21 +2186,21 @@ def create_app() -> Flask:
                 graph_urls.append(url_for("static", filename=out_rel))
 
             # Candidate series from detail metrics
-            hr = _collect_series(rows, idx_map.get("directHeartRate") or idx_map.get("heartRate"))
-            speed_ms = _collect_series(rows, idx_map.get("directSpeed") or idx_map.get("speed"))
-            run_cad = _collect_series(rows, idx_map.get("directRunCadence") or idx_map.get("directDoubleCadence"))
-            bike_cad = _collect_series(rows, idx_map.get("directBikeCadence") or idx_map.get("directCadence"))
-            power = _collect_series(rows, idx_map.get("directPower") or idx_map.get("directBikePower"))
+            hr = _collect_series(matrix, idx_map.get("directHeartRate") or idx_map.get("heartRate"))
+            speed_ms = _collect_series(matrix, idx_map.get("directSpeed") or idx_map.get("speed"))
+            run_cad = _collect_series(matrix, idx_map.get("directRunCadence") or idx_map.get("directDoubleCadence"))
+            bike_cad = _collect_series(matrix, idx_map.get("directBikeCadence") or idx_map.get("directCadence"))
+            power = _collect_series(matrix, idx_map.get("directPower") or idx_map.get("directBikePower"))
 
             swim_cad = _collect_series(
-                rows,
+                matrix,
                 idx_map.get("directSwimCadence")
                 or idx_map.get("swimCadence")
                 or idx_map.get("directDoubleCadence")
                 or idx_map.get("directRunCadence"),
             )
             swolf = _collect_series(
-                rows,
+                matrix,
                 idx_map.get("directSwolf")
                 or idx_map.get("swolf")
                 or idx_map.get("directSwimSwolf")
@@ -2329,8 +2386,7 @@ def create_app() -> Flask:
 
         def run(progress):
             progress(2.0, "Connexion Garmin…")
-            handler = GarminClientHandler(creds.email, garmin_password, creds.user_id)
-            handler.login()
+            handler = build_garmin_handler(creds, garmin_password)
             progress(5.0, "Synchronisation des activités…")
             handler.update_activity_data(progress=progress)
             repo.invalidate_prefix(f"activities:{creds.user_id}")
@@ -2359,11 +2415,12 @@ def create_app() -> Flask:
 
         if not task_running:
             health_manager.plot_interactive_graphs("static/health")
-        health_graphs = [
-            url_for("static", filename=f"health/{f}")
-            for f in os.listdir("static/health")
-            if f.endswith(".html")
-        ]
+        with os.scandir("static/health") as it:
+            health_graphs = [
+                url_for("static", filename=f"health/{entry.name}")
+                for entry in it
+                if entry.name.endswith(".html") and entry.is_file()
+            ]
         return render_template(
             "health.html",
             graphs=health_graphs,
@@ -2382,8 +2439,7 @@ def create_app() -> Flask:
 
         def run(progress):
             progress(2.0, "Connexion Garmin…")
-            handler = GarminClientHandler(creds.email, garmin_password, creds.user_id)
-            handler.login()
+            handler = build_garmin_handler(creds, garmin_password)
             progress(5.0, "Synchronisation de la santé…")
             handler.update_health_data(progress=progress)
             repo.invalidate_prefix(f"health_stats:{creds.user_id}")
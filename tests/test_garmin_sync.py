@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+
+requests = pytest.importorskip("requests")
+garth_exc = pytest.importorskip("garth.exc")
+
+from garmin_tracker.garmin_sync import _call_with_date, _is_transient, _with_retry
+
+
+def _http_error(status: int) -> "requests.HTTPError":
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} Client Error", response=response)
+
+
+def _garth_error(status: int) -> Exception:
+    return garth_exc.GarthHTTPError(msg="Error in request", error=_http_error(status))
+
+
+class GarminConnectConnectionError(Exception):
+    """Stand-in for garminconnect's wrapper, raised while handling the garth error."""
+
+
+def _reraised_like_garminconnect(status: int) -> Exception:
+    try:
+        try:
+            raise _garth_error(status)
+        except garth_exc.GarthHTTPError as e:
+            raise GarminConnectConnectionError(f"Error: {e}")
+    except GarminConnectConnectionError as wrapped:
+        return wrapped
+
+
+def test_garth_http_error_429_is_transient():
+    assert _is_transient(_garth_error(429))
+
+
+def test_garth_http_error_reraised_by_garminconnect():
+    assert _is_transient(_reraised_like_garminconnect(429))
+    assert _is_transient(_reraised_like_garminconnect(503))
+    assert not _is_transient(_reraised_like_garminconnect(401))
+
+
+def test_requests_network_errors_are_transient():
+    assert _is_transient(requests.exceptions.ConnectionError("reset"))
+    assert _is_transient(requests.exceptions.ReadTimeout("slow"))
+    assert not _is_transient(requests.exceptions.InvalidURL("bad"))
+
+
+def test_with_retry_retries_garth_429(monkeypatch):
+    monkeypatch.setattr("garmin_tracker.garmin_sync.time.sleep", lambda _s: None)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _garth_error(429)
+        return "ok"
+
+    assert _with_retry(fn) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_with_date_does_not_reprobe_after_transient_errors(monkeypatch):
+    monkeypatch.setattr("garmin_tracker.garmin_sync.time.sleep", lambda _s: None)
+    monkeypatch.setattr("garmin_tracker.garmin_sync._METHOD_SHAPE_CACHE", {})
+    calls = []
+    throttled = False
+
+    class Client:
+        def get_stats(self, d):
+            calls.append(d)
+            if type(d) is not date:
+                raise TypeError("unsupported date shape")
+            if throttled:
+                raise _garth_error(429)
+            return {"steps": 1}
+
+    day = date(2026, 1, 1)
+    assert _call_with_date(Client(), "get_stats", day) == {"steps": 1}
+
+    throttled = True
+    calls.clear()
+    assert _call_with_date(Client(), "get_stats", day) is None
+    assert calls == [day] * 4  # the cached shape's retries only, no other shape probed